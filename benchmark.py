@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Headless rendering benchmarks of the canvas on synthetic Barabasi-Albert graphs.
+
+    python3 benchmark.py --sizes 1000 10000 100000 --output bench.json
+
+Runs on Qt's offscreen platform unless QT_QPA_PLATFORM says otherwise, and
+writes the timings (milliseconds) as JSON, to compare them across commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from math import sqrt
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import igraph
+import numpy as np
+from PyQt5.QtCore import QPoint, QPointF, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+from canvas import Canvas, DarkViewMode
+
+WIDTH, HEIGHT = 1080, 650
+
+
+def makeGraph(n, seed):
+    """
+    Barabasi-Albert graph of *n* vertices laid out at random, with about the same
+    density of vertices on screen at zoom 1 whatever *n*
+    """
+    random.seed(seed)
+    g = igraph.Graph.Barabasi(n, 3, directed=True)
+    g.vs['title'] = [str(i) for i in range(n)]
+    g.vs['pageid'] = list(range(n))
+    g.vs['visited'] = True
+    side = sqrt(n / 1000)
+    g.vs['x'] = [random.uniform(0, WIDTH * side) for _ in range(n)]
+    g.vs['y'] = [random.uniform(0, HEIGHT * side) for _ in range(n)]
+    return g
+
+
+def summarize(samples):
+    samples = np.array(samples) * 1000
+    return {
+        'n': len(samples),
+        'min': float(samples.min()),
+        'median': float(np.median(samples)),
+        'p95': float(np.percentile(samples, 95)),
+        'mean': float(samples.mean()),
+    }
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def benchmarkSize(n, repeat, seed):
+    g = makeGraph(n, seed)
+    canvas = Canvas(WIDTH, HEIGHT)
+    canvas.resize(WIDTH, HEIGHT)
+    canvas.addMode(DarkViewMode(canvas))
+    image = QImage(WIDTH, HEIGHT, QImage.Format_ARGB32_Premultiplied)
+
+    def frame():
+        canvas.updateFrame()
+        painter = QPainter(image)
+        canvas.paint(painter, complete=True)
+        painter.end()
+
+    def fullUpdate():
+        canvas.invalidate()
+        canvas.updateFrame()
+
+    def uncachedPaint():
+        canvas.tileCache.clear()
+        frame()
+
+    results = {'setGraph': summarize(timed(lambda: canvas.setGraph(g.copy()), 1))}
+    canvas.zoom = 1
+    canvas.center = QPointF(WIDTH / 2, HEIGHT / 2)
+    frame()
+
+    results['updateViewRect'] = summarize(timed(fullUpdate, repeat))
+    results['paint'] = summarize(timed(uncachedPaint, repeat))
+    results['paintCached'] = summarize(timed(frame, repeat))
+
+    def zoomStep(step):
+        def run():
+            canvas.zoomIn() if step % 10 < 5 else canvas.zoomOut()
+            frame()
+        return run
+
+    results['zoom'] = summarize([t for step in range(10 * repeat) for t in timed(zoomStep(step), 1)])
+
+    def panStep():
+        canvas.center = canvas.center + QPointF(40 / canvas.zoom, 25 / canvas.zoom)
+        canvas.invalidate(canvas.DIRTY_VIEW)
+        frame()
+
+    results['pan'] = summarize(timed(panStep, 20 * repeat))
+
+    rng = np.random.default_rng(seed)
+    clicks = [QPoint(int(x), int(y)) for x, y in zip(rng.integers(0, WIDTH, 1000), rng.integers(0, HEIGHT, 1000))]
+    results['pick'] = summarize([
+        t for pos in clicks for t in timed(lambda: canvas.pickVertex(pos) or canvas.pickEdge(pos), 1)
+    ])
+    results['drawn'] = {'vertices': len(canvas.drawnVertices), 'edges': len(canvas.drawnEdges)}
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'numpy': np.__version__,
+        'igraph': igraph.__version__,
+        'qpa': os.environ['QT_QPA_PLATFORM'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless rendering benchmarks of the canvas')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON file to write, stdout if not given')
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    results = {}
+    for n in args.sizes:
+        results[str(n)] = benchmarkSize(n, args.repeat, args.seed)
+        for name, stats in results[str(n)].items():
+            if 'median' in stats:
+                print('%8d %-16s median %9.2f ms  p95 %9.2f ms' % (n, name, stats['median'], stats['p95']),
+                      file=sys.stderr)
+
+    report = json.dumps({'meta': metadata(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
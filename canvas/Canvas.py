@@ -1,12 +1,19 @@
-from math import sqrt, atan2, cos
+from collections import Counter
 from typing import Union
 
 import igraph
+import numpy as np
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 from igraph import Graph
 
-from .Mode import Mode
+from .DetailLoader import DetailLoader
+from .EdgeRenderer import EdgeRenderer, arrowHeads, arrowLines
+from .Mode import Mode, HOOKS
+from .Profiler import Profiler
+from .SpatialIndex import SpatialIndex, IncidenceIndex, EdgeIndex, sortedContains
+from .TileCache import TileCache
+from .VertexRenderer import VertexRenderer
 from .utils import *
 
 
@@ -23,6 +30,10 @@ def bind(instance, func, as_name=None):
     return bound_method
 
 
+def overrides(mode, hook):
+    return hook in vars(mode) or getattr(type(mode), hook) is not getattr(Mode, hook)
+
+
 def wrapGraph(graph):
     def reference(self):
         return self.vs['refCount']
@@ -37,6 +48,7 @@ def wrapGraph(graph):
     graph['title'] = dict()
     graph['pageid'] = dict()
     graph['loadDetails'] = True
+    graph['lazyDetails'] = False
 
     return graph
 
@@ -46,9 +58,25 @@ class Canvas(QWidget):
     ARROW_SIZE = 8
     SELECTED_ARROW_SIZE = 12
     SELECTED_POINT_RADIUS = 12
+    LOD_POINT_SIZE = 3
     LINE_DISTANCE = 2
     CURVE_SELECT_SQUARE_SIZE = 10
 
+    # drawn geometry is computed for the view extended by this fraction of its size on each side,
+    # so that panning within it only moves the painter's transform
+    CACHE_MARGIN = 0.5
+    # seconds of rasterization per frame in progressive rendering
+    FRAME_BUDGET = 0.03
+
+    # what has to be recomputed before the next paint, see invalidate()
+    DIRTY_VIEW = 1  # zoom / pan
+    DIRTY_POSITIONS = 2  # vertex coordinates
+    DIRTY_VISIBILITY = 4  # which vertices & edges are drawn
+    DIRTY_COLORS = 8  # vertex & edge colors
+    DIRTY_FLOATING = 16  # coordinates of floating vertices only, see setFloatingVertices()
+    DIRTY_GEOMETRY = DIRTY_VIEW | DIRTY_POSITIONS | DIRTY_VISIBILITY
+    DIRTY_ALL = DIRTY_GEOMETRY | DIRTY_COLORS | DIRTY_FLOATING
+
     def __init__(self, width: int, height: int):
         super().__init__(None)
 
@@ -67,58 +95,164 @@ class Canvas(QWidget):
         self.selectedEdges = self.selectedVertices = []
         self.viewRect = self.verticesToDraw = self.edgesToDraw = None
 
+        # absolute coordinates of vertices, indexed by vertex index. Everything is drawn in
+        # absolute coordinates, the painter's transform maps them to the screen
+        self.xs = self.ys = np.empty(0)
+        self.transform = QTransform()
+        self.cacheRect = QRectF()
+        self.arrowZoom = None
+        self.vertexIndex = SpatialIndex()
+        self.edgeIndex = EdgeIndex()
+        self.incidence = IncidenceIndex()
+        self.drawnVertices = self.drawnEdges = np.empty(0, dtype=np.int64)
+        self.vertexOrder = self.edgeOrder = np.empty(0, dtype=np.int64)
+        self.staticVertices = np.empty(0, dtype=np.int64)
+        self.staticLines, self.staticHeads, self.staticEdgeColors = np.empty((0, 4, 4)), np.empty((0, 3, 2)), []
+        self.staticXs = self.staticYs = np.empty(0)
+        self.staticVertexColors = []
+        self.floatingVertices = self.floatingEdges = np.empty(0, dtype=np.int64)
+        self.edgeLines = np.empty((0, 4, 4))
+        self.edgeHeads = np.empty((0, 3, 2))
+        self.edgeRenderer = EdgeRenderer()
+        self.selectedEdgeRenderer = EdgeRenderer()
+        self.vertexRenderer = VertexRenderer()
+        self.floatingEdgeRenderer = EdgeRenderer()
+        self.floatingVertexRenderer = VertexRenderer()
+        self.tileCache = TileCache(self)
+        self.detailLoader = DetailLoader()
+
+        # level of detail: arrowheads are dropped & vertices drawn as points when zoomed out below
+        # lodZoom, or when there are more edges / vertices around the screen than lodArrowheadCount /
+        # lodVertexShapeCount. Past lodEdgeLineCount edges, edges are drawn as a density image
+        self.lodZoom = 0.5
+        self.lodArrowheadCount = 5000
+        self.lodVertexShapeCount = 5000
+        self.lodEdgeLineCount = 100000
+        self.drawArrowheads = True
+        self.drawPoints = False
+
         self.g = None
         self.modes = []
+        self.hooks = {hook: [] for hook in HOOKS}
+        self.profiler = Profiler()
+        self.dirty = self.DIRTY_ALL
 
     def toScaledXY(self, x, y):
         return self.toScaledX(x), self.toScaledY(y)
 
     def toScaledX(self, x):
-        return float((x - self.viewRect.x()) * self.zoom)
+        return float(x * self.zoom + self.transform.dx())
 
     def toScaledY(self, y):
-        return float((y - self.viewRect.y()) * self.zoom)
+        return float(y * self.zoom + self.transform.dy())
 
     def toAbsoluteXY(self, x, y):
         return self.toAbsoluteX(x), self.toAbsoluteY(y)
 
     def toAbsoluteX(self, x):
-        return float(x / self.zoom + self.viewRect.x())
+        return float((x - self.transform.dx()) / self.zoom)
 
     def toAbsoluteY(self, y):
-        return float(y / self.zoom + self.viewRect.y())
+        return float((y - self.transform.dy()) / self.zoom)
 
     def close(self):
-        for mode in self.modes:
-            if mode.onClose():
-                break
+        self.dispatch('onClose')
+        self.detailLoader.close()
         super().close()
 
+    def invalidate(self, flags=DIRTY_ALL):
+        """
+        Mark cached geometry as outdated and schedule a repaint. Repaints with
+        nothing dirty only rasterize what has already been computed
+        """
+        self.dirty |= flags
+        self.update()
+
     def setGraph(self, g: Union[str, Graph]):
         if isinstance(g, str):
             g = igraph.read(g)
         self.g = wrapGraph(g)
-
-        for mode in self.modes:
-            if mode.onSetGraph():
-                break
+        self.xs = self.ys = np.empty(0)
+        self.vertexIndex = SpatialIndex()
+        self.edgeIndex = EdgeIndex()
+        self.incidence = IncidenceIndex()
+        self.floatingVertices = np.empty(0, dtype=np.int64)
+        self.syncVerticesXY()
+
+        self.dispatch('onSetGraph')
         self.resetViewRect()
-        self.update()
+        self.invalidate()
+
+    def setVerticesXY(self, xs, ys):
+        """
+        Replace coordinates of all vertices at once. The graph's x / y attributes
+        are kept in sync so that they are saved & restored with the graph
+        """
+        self.xs = np.array(xs, dtype=float)
+        self.ys = np.array(ys, dtype=float)
+        self.g.vs['x'] = self.xs.tolist()
+        self.g.vs['y'] = self.ys.tolist()
+        self.vertexIndex.rebuild(self.xs, self.ys)
+        self.resetEdgeIndex()
+        self.invalidate(self.DIRTY_POSITIONS)
+
+    def setVertexXY(self, index, x, y):
+        self.xs[index] = x
+        self.ys[index] = y
+        self.vertexIndex.move(index)
+        self.edgeIndex.move(self.incidence.incident(np.array([index])))
+        if sortedContains(self.floatingVertices, np.array([index]))[0]:
+            self.invalidate(self.DIRTY_FLOATING)
+        else:
+            self.invalidate(self.DIRTY_POSITIONS)
+        vertex = self.g.vs[index]
+        vertex['x'] = x
+        vertex['y'] = y
+
+    def setFloatingVertices(self, vertices):
+        """
+        Take *vertices* and their edges out of the static layers, e.g. while they
+        are dragged: they are drawn on top of the rest, and moving them with
+        setVertexXY only recomputes their own geometry
+        """
+        self.floatingVertices = np.unique(np.array(vertices, dtype=np.int64))
+        self.invalidate(self.DIRTY_POSITIONS)
+
+    def syncVerticesXY(self):
+        """
+        Append coordinates of vertices added to the graph (e.g. by the crawler)
+        since the last bulk update
+        """
+        n = len(self.xs)
+        vcount = self.g.vcount()
+        if n >= vcount:
+            return
+        newVertices = self.g.vs[n:vcount]
+        if 'x' in self.g.vs.attributes() and 'y' in self.g.vs.attributes():
+            newXs = np.array(newVertices['x'], dtype=float)
+            newYs = np.array(newVertices['y'], dtype=float)
+        else:
+            newXs = np.full(vcount - n, self.WIDTH / 2)
+            newYs = np.full(vcount - n, self.HEIGHT / 2)
+        self.xs = np.concatenate([self.xs, newXs])
+        self.ys = np.concatenate([self.ys, newYs])
+        self.vertexIndex.extend(self.xs, self.ys)
+        self.resetEdgeIndex()
+
+    def resetEdgeIndex(self):
+        self.edgeIndex.reset(self.xs, self.ys, self.incidence.sources, self.incidence.targets)
 
     def notifyNewVertices(self):
+        self.syncVerticesXY()
         if self.liveUpdate:
-            for mode in self.modes:
-                if mode.onNewVerticesAdded():
-                    break
-        self.update()
+            self.dispatch('onNewVerticesAdded')
+        self.invalidate()
 
     def saveGraph(self, fileName, saveDetails=False):
         g = self.g.copy()
         del g['title']
         del g['category']
         del g['pageid']
-        del g.vs['pos']
-        del g.es['line']
         if not saveDetails:
             del g.es['color']
             del g.vs['color']
@@ -139,7 +273,7 @@ class Canvas(QWidget):
         if mode in self.modes:
             mode.onUnset()
             mode.onSet()
-            self.update()
+            self.invalidate()
             return
 
         def isConflict(m: Mode):
@@ -156,17 +290,42 @@ class Canvas(QWidget):
             else:
                 modes.append(m)
         self.modes = sorted(modes + [mode], key=lambda m: m.priority)
-        self.update()
+        self.updateHooks()
+        self.invalidate()
 
     def removeMode(self, mode: Mode):
         if mode in self.modes:
             self.modes.remove(mode)
+            self.updateHooks()
             mode.onUnset()
-            self.update()
+            self.invalidate()
             return True
         self.update()
         return False
 
+    def updateHooks(self):
+        """
+        For each hook, the modes which override it, so that events skip the default no-op hooks
+        """
+        self.hooks = {
+            hook: [getattr(mode, hook) for mode in self.modes if overrides(mode, hook)]
+            for hook in HOOKS
+        }
+        if self.profiler.enabled:
+            self.hooks = {
+                hook: [self.profiler.wrap('%s.%s' % (type(h.__self__).__name__, hook), h) for h in handlers]
+                for hook, handlers in self.hooks.items()
+            }
+
+    def dispatch(self, hook, *args):
+        """
+        Call *hook* of the modes in priority order, until one of them returns True
+        """
+        for handler in self.hooks[hook]:
+            if handler(*args):
+                return True
+        return False
+
     def toggleMode(self, mode: Mode):
         if mode in self.modes:
             self.removeMode(mode)
@@ -174,204 +333,349 @@ class Canvas(QWidget):
             self.addMode(mode)
 
     def resetViewRect(self):
-        for mode in self.modes:
-            if mode.onResetViewRect():
-                break
+        self.dispatch('onResetViewRect')
 
         self.center = QPointF(self.WIDTH / 2, self.HEIGHT / 2)
         self.zoom = 1
 
+        self.dirty |= self.DIRTY_VIEW
         self.updateViewRect()
 
-    def createArrow(self, start, end, big=False):
-        arrowSize = self.SELECTED_ARROW_SIZE if big else self.ARROW_SIZE
-        xStart = start.x()
-        yStart = start.y()
-        xEnd = end.x()
-        yEnd = end.y()
-
-        baseVector = QVector2D(-xEnd + xStart, -yEnd + yStart)
-        unitVector = baseVector / baseVector.length()
-        baseVector = unitVector * arrowSize
-        a = atan2(baseVector.y(), baseVector.x())
-        p = pi / 6
-        xb = arrowSize * cos(a - p)
-        yb = arrowSize * sin(a - p)
-        xc = arrowSize * cos(a + p)
-        yc = arrowSize * sin(a + p)
-
-        xEnd += unitVector.x() * self.POINT_RADIUS / 2
-        yEnd += unitVector.y() * self.POINT_RADIUS / 2
-
-        path = QPainterPath(QPointF(xStart, yStart))
-        path.lineTo(xEnd, yEnd)
-        path.lineTo(xEnd + xb, yEnd + yb)
-        path.lineTo(xEnd + xc, yEnd + yc)
-        path.lineTo(xEnd, yEnd)
-
-        return path
+    def createArrows(self, sources, targets, big=False):
+        """
+        Segments to stroke (n, 4, 4) and arrowhead triangles (n, 3, 2) of the
+        arrows between the vertices *sources* & *targets*, in absolute coordinates.
+        Arrowheads keep the same size in pixels, so they depend on the zoom
+        """
+        xs, ys = self.xs, self.ys
+        heads = arrowHeads(
+            xs[sources], ys[sources], xs[targets], ys[targets],
+            (self.SELECTED_ARROW_SIZE if big else self.ARROW_SIZE) / self.zoom, self.POINT_RADIUS / self.zoom
+        )
+        return arrowLines(np.column_stack([xs[sources], ys[sources]]), heads), heads
 
     def updateViewRect(self):
-        viewRectWidth = self.WIDTH / self.zoom
-        viewRectHeight = self.HEIGHT / self.zoom
-        viewRectX = self.center.x() - viewRectWidth / 2
-        viewRectY = self.center.y() - viewRectHeight / 2
-        self.viewRect = QRectF(viewRectX, viewRectY, viewRectWidth, viewRectHeight)
-
-        self.g.vs['pos'] = [QPointF(
-            self.toScaledX(v['x']),
-            self.toScaledY(v['y'])
-        ) for v in self.g.vs]
-
-        self.g.es['line'] = [self.createArrow(
-            self.g.vs[e.source]['pos'],
-            self.g.vs[e.target]['pos'],
-        ) for e in self.g.es]
-
-        def shouldDrawVertex(v):
-            if not self.showUnvisited and not v['visited']:
-                return False
-            return self.viewRect.contains(v['x'], v['y'])
-
-        self.verticesToDraw = [v for v in self.g.vs if shouldDrawVertex(v)]
-
-        index = set(v.index for v in self.verticesToDraw)
-
-        def shouldDrawEdge(e):
-            s, t, vs = e.source, e.target, self.g.vs
-            if not (s in index or t in index):
-                return False
-            if not self.showUnvisited and not vs[t]['visited']:
-                return False
-            return True
+        if not self.dirty & self.DIRTY_GEOMETRY:
+            return
 
-        self.edgesToDraw = [e for e in self.g.es if shouldDrawEdge(e)]
+        if self.dirty & (self.DIRTY_VIEW | self.DIRTY_POSITIONS):
+            viewRectWidth = self.WIDTH / self.zoom
+            viewRectHeight = self.HEIGHT / self.zoom
+            viewRectX = self.center.x() - viewRectWidth / 2
+            viewRectY = self.center.y() - viewRectHeight / 2
+            self.viewRect = QRectF(viewRectX, viewRectY, viewRectWidth, viewRectHeight)
+            # translation is rounded to whole pixels, as are the tiles of the cache
+            self.transform = QTransform(
+                self.zoom, 0, 0, self.zoom, -round(viewRectX * self.zoom), -round(viewRectY * self.zoom)
+            )
 
-        for mode in self.modes:
-            if mode.onUpdateViewRect():
-                break
+            # edges are snapshotted before syncing, so that they never refer to a vertex without coordinates
+            # even if the crawler is adding more vertices concurrently
+            if self.g.ecount() != len(self.incidence):
+                edgeList = self.g.get_edgelist()
+                self.syncVerticesXY()
+                self.incidence.rebuild(edgeList, len(self.xs))
+                self.resetEdgeIndex()
+            else:
+                self.syncVerticesXY()
+
+        # the cached region is recomputed once the view leaves it, or is much smaller than it
+        recull = self.dirty & (self.DIRTY_POSITIONS | self.DIRTY_VISIBILITY) or \
+            not self.cacheRect.contains(self.viewRect) or \
+            self.cacheRect.width() > 2 * (1 + 2 * self.CACHE_MARGIN) * self.viewRect.width()
+        self.dirty &= ~self.DIRTY_GEOMETRY
+
+        if recull:
+            with self.profiler.section('updateDrawn'):
+                self.updateDrawn()
+        elif self.zoom == self.arrowZoom:
+            # panning: the cached geometry is only drawn with another transform
+            return
+        self.updateArrows()
+
+    def updateDrawn(self):
+        """
+        Vertices & edges drawn in the view extended by CACHE_MARGIN
+        """
+        marginX = self.viewRect.width() * self.CACHE_MARGIN
+        marginY = self.viewRect.height() * self.CACHE_MARGIN
+        self.cacheRect = self.viewRect.adjusted(-marginX, -marginY, marginX, marginY)
+
+        vs, es = self.g.vs, self.g.es
+        vertices = self.vertexIndex.query(self.cacheRect)
+        if not self.showUnvisited:
+            vertices = vertices[np.array(vs.select(vertices.tolist())['visited'], dtype=bool)]
+
+        edges = self.incidence.incident(vertices)
+        if not self.showUnvisited:
+            targets = self.incidence.targets[edges]
+            edges = edges[np.array(vs.select(targets.tolist())['visited'], dtype=bool)]
+
+        self.verticesToDraw = [vs[int(i)] for i in vertices]
+        self.edgesToDraw = [es[int(i)] for i in edges]
+
+        self.dispatch('onUpdateViewRect')
+
+        self.vertexOrder = np.array([v.index for v in self.verticesToDraw], dtype=np.int64)
+        self.drawnVertices = np.sort(self.vertexOrder)
+        self.edgeOrder = np.array([e.index for e in self.edgesToDraw], dtype=np.int64)
+        self.drawnEdges = np.sort(self.edgeOrder)
+
+    def updateArrows(self):
+        """
+        Arrows of the drawn edges at the current zoom, in buffers for the batched renderer
+        """
+        edges = self.edgeOrder
+        with self.profiler.section('createArrows'):
+            self.edgeLines, self.edgeHeads = self.createArrows(
+                self.incidence.sources[edges], self.incidence.targets[edges]
+            )
+        self.arrowZoom = self.zoom
+        self.updateRenderers()
+
+    def updateRenderers(self):
+        with self.profiler.section('updateRenderers'):
+            self.buildRenderers()
+        self.updateFloating()
+
+    def buildRenderers(self):
+        zoomedOut = self.zoom < self.lodZoom
+        edgeColors = [e['color'] for e in self.edgesToDraw]
+        vertexColors = [v['color'] for v in self.verticesToDraw]
+        lines, heads = self.edgeLines, self.edgeHeads
+        vertices = self.vertexOrder
+
+        # floating vertices & their edges are left out of the static layers
+        floatingEdges = np.isin(self.incidence.sources[self.edgeOrder], self.floatingVertices) | \
+            np.isin(self.incidence.targets[self.edgeOrder], self.floatingVertices)
+        self.floatingEdges = self.edgeOrder[floatingEdges]
+        floatingVertices = np.isin(vertices, self.floatingVertices)
+        if floatingEdges.any() or floatingVertices.any():
+            edgeColors = [c for c, floating in zip(edgeColors, floatingEdges) if not floating]
+            lines, heads = lines[~floatingEdges], heads[~floatingEdges]
+            vertexColors = [c for c, floating in zip(vertexColors, floatingVertices) if not floating]
+            vertices = vertices[~floatingVertices]
+        self.staticVertices = vertices
+        # buffers of the static layers for StaticScene, replaced on every build & never modified
+        self.staticLines, self.staticHeads, self.staticEdgeColors = lines, heads, edgeColors
+        self.staticXs, self.staticYs, self.staticVertexColors = self.xs[vertices], self.ys[vertices], vertexColors
+
+        self.drawArrowheads = not zoomedOut and len(edgeColors) <= self.lodArrowheadCount
+        self.drawPoints = zoomedOut or len(vertices) > self.lodVertexShapeCount
+        if len(edgeColors) > self.lodEdgeLineCount:
+            color = Counter(c.rgba() for c in edgeColors).most_common(1)[0][0]
+            self.edgeRenderer.buildDensity(lines[:, 0], self.cacheRect, self.zoom, QColor.fromRgba(color))
+        elif not self.drawArrowheads:
+            self.edgeRenderer.build(lines[:, :1], np.empty((0, 3, 2)), edgeColors)
+        else:
+            self.edgeRenderer.build(lines, heads, edgeColors)
+
+        self.vertexRenderer.build(self.xs[vertices], self.ys[vertices], vertexColors, points=self.drawPoints)
+        self.tileCache.clear()
+        self.dirty &= ~self.DIRTY_COLORS
+
+    def updateFloating(self):
+        """
+        Geometry of the floating vertices & their edges, at the same level of detail as the static layers
+        """
+        edges = self.floatingEdges
+        lines, heads = self.createArrows(self.incidence.sources[edges], self.incidence.targets[edges])
+        edgeColors = [self.g.es[int(i)]['color'] for i in edges]
+        if self.drawArrowheads:
+            self.floatingEdgeRenderer.build(lines, heads, edgeColors)
+        else:
+            self.floatingEdgeRenderer.build(lines[:, :1], np.empty((0, 3, 2)), edgeColors)
+
+        vertices = self.floatingVertices[sortedContains(self.drawnVertices, self.floatingVertices)]
+        self.floatingVertexRenderer.build(
+            self.xs[vertices], self.ys[vertices], [self.g.vs[int(i)]['color'] for i in vertices],
+            points=self.drawPoints
+        )
+        self.dirty &= ~self.DIRTY_FLOATING
+
+    def updateFrame(self):
+        """
+        Bring everything that is dirty up to date before painting
+        """
+        with self.profiler.section('updateViewRect'):
+            self.updateViewRect()
+        if self.dirty & self.DIRTY_COLORS:
+            self.updateRenderers()
+        if self.dirty & self.DIRTY_FLOATING:
+            with self.profiler.section('updateFloating'):
+                self.updateFloating()
 
     def paintEvent(self, event):
-        self.updateViewRect()
-        painter = QPainter()
-        painter.begin(self)
-        self.paint(painter)
+        profiler = self.profiler
+        with profiler.section('frame'):
+            self.updateFrame()
+            painter = QPainter()
+            painter.begin(self)
+            with profiler.section('paint'):
+                self.paint(painter)
+        if profiler.overlay:
+            profiler.paintOverlay(painter)
         painter.end()
 
-    def paint(self, painter):
-        for mode in self.modes:
-            if mode.onPaintBegin(painter):
-                break
-
-        for mode in self.modes:
-            if mode.beforePaintEdges(painter):
-                break
-        for edge in self.edgesToDraw:
-            painter.setPen(edge['color'])
-            painter.drawPath(edge['line'])
-
-        for mode in self.modes:
-            if mode.beforePaintVertices(painter):
-                break
-        for vertex in self.verticesToDraw:
-            painter.setBrush(vertex['color'])
-            painter.drawEllipse(
-                int(vertex['pos'].x() - self.POINT_RADIUS / 2.0),
-                int(vertex['pos'].y() - self.POINT_RADIUS / 2.0),
-                self.POINT_RADIUS, self.POINT_RADIUS
-            )
+    def paint(self, painter, complete=False):
+        """
+        *complete*: draw the whole frame before returning, e.g. to save it as an image
+        """
+        self.dispatch('onPaintBegin', painter)
+
+        self.tileCache.paint(painter, complete)
+
+        # from here on, drawing is done in absolute coordinates, with pens of a fixed width in pixels
+        painter.save()
+        painter.setTransform(self.transform)
+
+        for _ in self.paintEdgeLayer(painter, self.floatingEdgeRenderer):
+            pass
+        for _ in self.paintVertexLayer(painter, renderer=self.floatingVertexRenderer):
+            pass
+
+        self.dispatch('beforePaintSelectedEdges', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        if self.selectedEdges:
+            self.selectedEdgeRenderer.build(*self.createArrows(
+                np.array([e.source for e in self.selectedEdges], dtype=np.int64),
+                np.array([e.target for e in self.selectedEdges], dtype=np.int64),
+                big=True
+            ))
+            self.selectedEdgeRenderer.paint(painter)
+
+        self.dispatch('beforePaintSelectedVertices', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        for vertex in self.selectedVertices:
+            self.paintVertex(painter, vertex)
+        painter.restore()
+
+    def setProfiling(self, enabled):
+        """
+        Time the stages of every frame & the mode hooks, and show the timings over the canvas
+        """
+        self.profiler.enabled = self.profiler.overlay = enabled
+        self.profiler.reset()
+        self.updateHooks()
+        self.update()
 
-        for mode in self.modes:
-            if mode.beforePaintSelectedEdges(painter):
-                break
-        for edge in self.selectedEdges:
-            painter.drawPath(edge['line'])
+    def setProgressiveRendering(self, enabled):
+        """
+        Spread the rasterization of big frames over several event loop iterations, see TileCache
+        """
+        self.tileCache.frameBudget = self.FRAME_BUDGET if enabled else None
+        self.tileCache.clear()
+        self.update()
 
-        for mode in self.modes:
-            if mode.beforePaintSelectedVertices(painter):
-                break
-        for vertex in self.selectedVertices:
-            painter.setBrush(vertex['color'])
-            painter.drawEllipse(
-                int(vertex['pos'].x() - self.POINT_RADIUS / 2.0),
-                int(vertex['pos'].y() - self.POINT_RADIUS / 2.0),
-                self.POINT_RADIUS, self.POINT_RADIUS
-            )
+    def paintStatic(self, painter):
+        """
+        Edges & unselected vertices, which are cached in tiles. *painter* maps absolute coordinates
+        """
+        for _ in self.paintEdgeLayer(painter):
+            pass
+        for _ in self.paintVertexLayer(painter):
+            pass
+
+    def paintEdgeLayer(self, painter, renderer=None):
+        """
+        Set up *painter* for the edges, returns a generator drawing them batch by batch
+        """
+        self.dispatch('beforePaintEdges', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        return (renderer or self.edgeRenderer).paintBatches(painter)
+
+    def paintVertexLayer(self, painter, byDegree=False, renderer=None):
+        """
+        Set up *painter* for the unselected vertices, returns a generator drawing
+        them batch by batch, highest degree first if *byDegree*
+        """
+        self.dispatch('beforePaintVertices', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        order = None
+        if byDegree:
+            # vertices added since the last rebuild of the incidence index count as isolated
+            known = self.staticVertices < len(self.incidence.outStart) - 1
+            degree = np.zeros(len(self.staticVertices), dtype=np.int64)
+            degree[known] = self.incidence.degree(self.staticVertices[known])
+            order = np.argsort(-degree, kind='stable')
+        return (renderer or self.vertexRenderer).paintBatches(
+            painter, self.POINT_RADIUS / self.zoom, self.LOD_POINT_SIZE, order
+        )
+
+    def paintVertex(self, painter, vertex):
+        radius = self.POINT_RADIUS / self.zoom
+        painter.setBrush(vertex['color'])
+        painter.drawEllipse(QRectF(
+            self.xs[vertex.index] - radius / 2.0, self.ys[vertex.index] - radius / 2.0, radius, radius
+        ))
 
     def zoomIn(self):
         self.zoom *= 1.2
-        self.update()
+        self.invalidate(self.DIRTY_VIEW)
 
     def zoomOut(self):
         self.zoom /= 1.2
-        self.update()
+        self.invalidate(self.DIRTY_VIEW)
 
     def zoomReset(self):
         self.zoom = 1
         self.center = QPointF(self.WIDTH / 2, self.HEIGHT / 2)
-        self.update()
+        self.invalidate(self.DIRTY_VIEW)
 
     def wheelEvent(self, event):
         self.zoom += event.angleDelta().y() / 120 * 0.05
-        self.update()
+        self.invalidate(self.DIRTY_VIEW)
+
+    def pickVertex(self, pos):
+        """
+        The first drawn vertex within POINT_RADIUS pixels of *pos*, or None
+        """
+        radius = self.POINT_RADIUS / self.zoom
+        point = self.transform.inverted()[0].map(QPointF(pos))
+        x, y = point.x(), point.y()
+        vertices = self.vertexIndex.query(QRectF(x - radius, y - radius, 2 * radius, 2 * radius))
+        vertices = vertices[sortedContains(self.drawnVertices, vertices)]
+        distances = (self.xs[vertices] - x) ** 2 + (self.ys[vertices] - y) ** 2
+        vertices = vertices[distances <= radius ** 2]
+        return self.g.vs[int(vertices[0])] if len(vertices) > 0 else None
+
+    def pickEdge(self, pos):
+        """
+        The first drawn edge passing through the CURVE_SELECT_SQUARE_SIZE square around *pos*, or None
+        """
+        size = self.CURVE_SELECT_SQUARE_SIZE / self.zoom
+        point = self.transform.inverted()[0].map(QPointF(pos))
+        x, y = point.x(), point.y()
+        edges = self.edgeIndex.query(QRectF(x - size / 2, y - size / 2, size, size))
+        edges = edges[sortedContains(self.drawnEdges, edges)]
+        return self.g.es[int(edges[0])] if len(edges) > 0 else None
 
     def mousePressEvent(self, event):
         pos = event.pos()
 
-        clickedSquare = QPainterPath(pos)
-        clickedSquare.addRect(QRectF(
-            pos.x() - self.CURVE_SELECT_SQUARE_SIZE / 2,
-            pos.y() - self.CURVE_SELECT_SQUARE_SIZE / 2,
-            self.CURVE_SELECT_SQUARE_SIZE,
-            self.CURVE_SELECT_SQUARE_SIZE
-        ))
+        vertex = self.pickVertex(pos)
+        if vertex is not None:
+            self.dispatch('onSelectVertex', vertex, event)
+            self.update()
+            return
 
-        def clickToLine(line):
-            if isinstance(line, QLineF):
-                try:
-                    d = abs((line.x2() - line.x1()) * (line.y1() - pos.y()) - (line.x1() - pos.x()) *
-                            (line.y2() - line.y1())) / sqrt((line.x2() - line.x1()) ** 2 + (line.y2() - line.y1()) ** 2)
-                except ZeroDivisionError:
-                    return False
-                return d < self.LINE_DISTANCE and min(line.x1(), line.x2()) < pos.x() < max(line.x1(), line.x2())
-
-            return line.intersects(clickedSquare)
-
-        def clickedToPoint(point):
-            return self.POINT_RADIUS ** 2 >= (point.x() - pos.x()) ** 2 + (point.y() - pos.y()) ** 2
-
-        for v in self.verticesToDraw:
-            if clickedToPoint(v['pos']):
-                for mode in self.modes:
-                    if mode.onSelectVertex(v, event):
-                        break
-                self.update()
-                return
-
-        for e in self.edgesToDraw:
-            if clickToLine(e['line']):
-                for mode in self.modes:
-                    if mode.onSelectEdge(e, event):
-                        break
-                self.update()
-                return
-
-        for mode in self.modes:
-            if mode.onSelectBackground(event):
-                return
+        edge = self.pickEdge(pos)
+        if edge is not None:
+            self.dispatch('onSelectEdge', edge, event)
+            self.update()
+            return
+
+        if self.dispatch('onSelectBackground', event):
+            return
 
         self.update()
 
     def mouseMoveEvent(self, event):
         pos = event.pos()
-        for mode in self.modes:
-            if mode.onMouseMove(event):
-                break
+        self.dispatch('onMouseMove', event)
         self.update()
 
     def mouseReleaseEvent(self, event):
         pos = event.pos()
-        for mode in self.modes:
-            if mode.onMouseRelease(event):
-                break
+        self.dispatch('onMouseRelease', event)
         self.update()
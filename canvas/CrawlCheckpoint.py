@@ -0,0 +1,73 @@
+import json
+import os
+
+
+class CrawlCheckpoint:
+    """
+    Append-only log of a crawl, one JSON object per line: the crawl settings,
+    then a record per batch applied to the graph with its pages, the vertices
+    which got no page & the time elapsed. Replaying the pages in order rebuilds
+    the graph, the depths & the frontier, so appending a line per batch is all
+    the checkpointing there is. A line cut by a crash is ignored & overwritten
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.size = 0
+
+    def begin(self, settings):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.write({'settings': settings})
+
+    def settings(self):
+        with open(self.path, encoding='utf-8') as f:
+            return json.loads(f.readline())['settings']
+
+    def batches(self):
+        """
+        Records of the batches in the log, read as they are consumed
+        """
+        with open(self.path, 'rb') as f:
+            line = f.readline()
+            self.size = len(line)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not isinstance(record, dict) or not {'pages', 'missing', 'timeElapsed'} <= record.keys():
+                    break
+                self.size += len(line)
+                yield record
+
+    def reopen(self):
+        """
+        Append to the log after the last complete record read by batches()
+        """
+        os.truncate(self.path, self.size)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def addBatch(self, pages, missing, timeElapsed):
+        """
+        *pages*: (vertex, WikiPage) applied in that order, *missing*: vertices without page
+        """
+        self.write({
+            'pages': [[vertex, vars(page)] for vertex, page in pages],
+            'missing': missing,
+            'timeElapsed': timeElapsed
+        })
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
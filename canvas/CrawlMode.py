@@ -1,23 +1,29 @@
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from random import randrange
 from threading import Thread, Lock
-from time import time, sleep
+from time import time
 
-import wikipedia
-from PyQt5.QtCore import pyqtSignal, QObject, QPointF
-from PyQt5.QtGui import QColor, QPainterPath
+from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtGui import QColor
 from igraph import Graph
-from wikipedia.exceptions import WikipediaException
 
+from .CrawlCheckpoint import CrawlCheckpoint
+from .DetailLoader import detailAttrs, NO_DETAILS
+from .Frontier import Frontier
 from .Mode import Mode
+from .PageCache import PageCache
+from .RateLimiter import RateLimiter
 from .ViewMode import ViewMode
+from .WikiApi import WikiApi, WikiApiError, WikiPage
 
 WHITE = QColor(255, 255, 255)
 
 
 class CrawlMode(Mode, QObject):
     priority = 99
+    # the crawl stops after this many batches in a row could not be fetched
+    MAX_FAILED_BATCHES = 10
 
     statusUpdatedSignal = pyqtSignal(object)
     newVerticesSignal = pyqtSignal(object)
@@ -36,11 +42,22 @@ class CrawlMode(Mode, QObject):
         self.crawlThread = self.pauseLock = None
         self.language = 'en'
         self.searchAlgo = 'RAND'
-        self.delay = 1
+        self.rate = 2
+        self.burst = 4
         self.loadDetails = True
+        self.lazyDetails = False
         self.startPage = None
         self.reachPage = self.maxPage = self.maxDepth = self.timeLimit = None
-        self.toCrawl = deque()
+        self.apiUrl = None
+        self.concurrency = 4
+        self.api = None
+        self.limiter = None
+        self.useCache = True
+        self.cachePath = 'cache/pages.sqlite'
+        self.cache = None
+        self.checkpointPath = 'cache/crawl.checkpoint'
+        self.checkpoint = None
+        self.toCrawl = Frontier()
 
         self._timeElapsed = 0
         self._status = 'stopped'  # stopped, paused, running, done
@@ -63,32 +80,55 @@ class CrawlMode(Mode, QObject):
         self._timeElapsed = value
         self.statusUpdatedSignal.emit(value)
 
+    def statusText(self):
+        if self.status == 'running' and self.limiter is not None:
+            return '%s (%.1f req/s)' % (self.status, self.limiter.effectiveRate())
+        return self.status
+
     def timeElapsedText(self):
         return str(timedelta(seconds=int(self.timeElapsed)))
 
     def onClose(self):
         self.stop()
 
-    def setCrawlSetting(self, language='en', searchAlgo='BFS', delay=1, startPage='Graph theory',
-                        loadDetails=True, reachPage=None, maxPage=None, maxDepth=None, timeLimit=None):
+    def setCrawlSetting(self, language='en', searchAlgo='BFS', rate=2, burst=4, startPage='Graph theory',
+                        loadDetails=True, reachPage=None, maxPage=None, maxDepth=None, timeLimit=None,
+                        apiUrl=None, concurrency=4, useCache=True, lazyDetails=False):
         self.language = language
+        self.apiUrl = apiUrl
+        self.concurrency = max(1, int(concurrency))
+        self.useCache = useCache
         self.searchAlgo = searchAlgo
-        self.delay = delay
+        self.rate = rate
+        self.burst = int(burst)
         self.startPage = startPage
         self.loadDetails = loadDetails
+        self.lazyDetails = lazyDetails
         self.reachPage = reachPage
         self.maxPage = maxPage
         self.maxDepth = maxDepth
         self.timeLimit = timeLimit
 
-    def checkStopConditions(self):
+    def crawlSetting(self):
+        """
+        Keyword arguments of setCrawlSetting giving the current settings
+        """
+        return {
+            'language': self.language, 'searchAlgo': self.searchAlgo, 'rate': self.rate, 'burst': self.burst,
+            'startPage': self.startPage, 'loadDetails': self.loadDetails, 'reachPage': self.reachPage,
+            'maxPage': self.maxPage, 'maxDepth': self.maxDepth, 'timeLimit': self.timeLimit,
+            'apiUrl': self.apiUrl, 'concurrency': self.concurrency, 'useCache': self.useCache,
+            'lazyDetails': self.lazyDetails
+        }
+
+    def checkStopConditions(self, vcount=None):
+        """
+        *vcount*: number of vertices, including the ones not added to the graph yet
+        """
         g = self.canvas.g
         if self.reachPage is not None and self.reachPage in g['title']:
             return True
-        if self.maxPage is not None and g.vcount() >= self.maxPage:
-            return True
-        if self.maxDepth is not None and len(
-                g.get_shortest_paths(0, g.vcount() - 1, output='epath')[0]) > self.maxDepth:
+        if self.maxPage is not None and (vcount or g.vcount()) >= self.maxPage:
             return True
         if self.timeLimit is not None and self.timeElapsed > self.timeLimit:
             return True
@@ -97,23 +137,88 @@ class CrawlMode(Mode, QObject):
     def createNewGraph(self):
         g = Graph(directed=True)
         self.canvas.setGraph(g)
-        g['loadDetails'] = self.loadDetails
+        # with lazy details, pages are crawled without their details, which are fetched when a vertex is selected
+        g['loadDetails'] = self.loadDetails and not self.lazyDetails
+        g['lazyDetails'] = self.loadDetails and self.lazyDetails
         g['title'][self.startPage] = 0
-        g.add_vertex(**self.createVertexInitAttr(self.startPage))
+        g.add_vertex(depth=0, **self.createVertexInitAttr(self.startPage))
+
+    def createClients(self):
+        self.limiter = RateLimiter(self.rate, self.burst)
+        self.api = WikiApi(self.language, self.apiUrl, self.limiter)
+        if self.useCache and self.cache is None:
+            self.cache = PageCache(self.cachePath)
+        self.canvas.detailLoader.setClients(self.language, self.api, self.cache if self.useCache else None)
+
+    def closeCache(self):
+        """
+        Close the PageCache, the next createClients opens it again. The detail loader
+        goes on without it, as do workers still fetching pages of the crawl
+        """
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
 
     def start(self):
         self.startSignal.emit(None)
+        self.createClients()
         if self.startPage is None:
-            self.startPage = wikipedia.random()
-        self.toCrawl = deque([0])
-        wikipedia.set_lang(self.language)
+            self.startPage = self.api.random()
+
+        self.createNewGraph()
+        self.toCrawl = self.createFrontier()
+        self.toCrawl.push(0)
+        self.checkpoint = CrawlCheckpoint(self.checkpointPath)
+        self.checkpoint.begin(self.crawlSetting())
+        self.startCrawlThread(0)
+
+    def resumeCrawl(self, path):
+        """
+        Continue the crawl logged in the checkpoint at *path*: the crawl thread replays
+        the log, then goes on appending to it. Later crawls are still logged at checkpointPath
+        """
+        checkpoint = CrawlCheckpoint(path)
+        self.setCrawlSetting(**checkpoint.settings())
+        self.startSignal.emit(None)
+        self.createClients()
 
+        self.createNewGraph()
+        self.toCrawl = self.createFrontier()
+        self.toCrawl.push(0)
+        self.checkpoint = checkpoint
+        self.startCrawlThread(0, resume=True)
+
+    def replay(self):
+        """
+        Run by the crawl thread: rebuild the graph & toCrawl from the whole log of the
+        checkpoint in a single addPages. Returns False if the log cannot be replayed
+        """
+        g = self.canvas.g
+        try:
+            records = list(self.checkpoint.batches())
+            self.addPages([
+                (visitedIndex, WikiPage.fromDict(page)) for record in records for visitedIndex, page in record['pages']
+            ], self.getViewMode().lineColor)
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            print('%s cannot be replayed: %s' % (self.checkpoint.path, e))
+            return False
+
+        done = set(g.vs.select(visited=True).indices)
+        for record in records:
+            done.update(record['missing'])
+        self.toCrawl.remove(done)
+        if len(records) > 0:
+            self.timeElapsed = records[-1]['timeElapsed']
+        self.checkpoint.reopen()
+        self.newVerticesSignal.emit(None)
+        return True
+
+    def startCrawlThread(self, timeElapsed, resume=False):
         self.status = 'running'
-        self.timeElapsed = 0
+        self.timeElapsed = timeElapsed
         self.terminate = False
         self.pauseLock = Lock()
-        self.createNewGraph()
-        self.crawlThread = Thread(target=self.crawl, daemon=False)
+        self.crawlThread = Thread(target=self.crawl, args=(resume,), daemon=False)
         self.crawlThread.start()
 
     def stop(self):
@@ -124,6 +229,7 @@ class CrawlMode(Mode, QObject):
             self.pauseLock.release()
         if self.crawlThread:
             self.crawlThread.join()
+        self.closeCache()
 
     def pause(self):
         self.pauseSignal.emit(None)
@@ -140,27 +246,72 @@ class CrawlMode(Mode, QObject):
             if isinstance(mode, ViewMode):
                 return mode
 
-    def crawl(self):
+    def createFrontier(self):
         g = self.canvas.g
+        if self.searchAlgo == 'PRIORITY':  # most linked pages first
+            return Frontier('PRIORITY', lambda vertex: g.degree(vertex, mode='in'))
+        return Frontier(self.searchAlgo)
+
+    def nextBatch(self):
+        """
+        Up to WikiApi.BATCH_SIZE vertices taken from toCrawl
+        """
+        batch = []
+        while len(self.toCrawl) > 0 and len(batch) < WikiApi.BATCH_SIZE:
+            batch.append(self.toCrawl.pop())
+        return batch
+
+    def fetchBatch(self, titles, loadDetails):
+        """
+        Run by the workers, which never touch the graph. Pages in the cache are not fetched.
+        Returns the pages found & the titles which could not be fetched
+        """
+        cache = self.cache if self.useCache else None
+        pages = cache.get(self.language, titles, loadDetails) if cache else {}
+        missing = [title for title in titles if title not in pages]
+        if len(missing) == 0:
+            return pages, set()
+        try:
+            fetched = self.api.fetchPages(missing, loadDetails)
+        except WikiApiError as e:
+            print(e)
+            return pages, set(missing)
+        if cache:
+            cache.put(self.language, fetched, loadDetails)
+        pages.update(fetched)
+        return pages, set()
+
+    def crawl(self, resume=False):
+        """
+        Up to *concurrency* batches are fetched at once by a pool of workers. This
+        thread is the only one to take from toCrawl & to change the graph, it applies
+        the batches in the order they were taken so that the search order is kept
+        as much as possible. With *resume*, the checkpoint is replayed first
+        """
+        g = self.canvas.g
+        if resume and not self.replay():
+            self.terminate = True
+        inFlight = deque()
+        failedBatches = 0
+        pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='crawl')
 
         while not self.terminate:
             startTime = time()
 
-            # get page to crawl
-            page = None
-            while page is None:
-                if len(self.toCrawl) == 0:
-                    self.terminate = True
+            # keep every worker busy with the next pages of toCrawl
+            while len(inFlight) < self.concurrency:
+                batch = self.nextBatch()
+                if len(batch) == 0:
                     break
-                visitedIndex = self.toCrawl.popleft()
-                pageTitle = g.vs[visitedIndex]['title']
-                print('>> ' + pageTitle)
-                try:
-                    page = wikipedia.page(pageTitle, preload=self.loadDetails)
-                    if page.pageid in g['pageid']:
-                        page = None
-                except (WikipediaException, KeyError) as e:
-                    print(e)
+                titles = [g.vs[index]['title'] for index in batch]
+                for title in titles:
+                    print('>> ' + title)
+                inFlight.append((batch, titles, pool.submit(self.fetchBatch, titles, g['loadDetails'])))
+            if len(inFlight) == 0:
+                break
+
+            batch, titles, future = inFlight.popleft()
+            pages, failed = future.result()
 
             # crawling usually takes a long time
             # -> terminate signal may come
@@ -168,39 +319,33 @@ class CrawlMode(Mode, QObject):
             if self.terminate:
                 break
 
-            # add vertices and edges
-            vertex = g.vs[visitedIndex]
-            vertex.update_attributes(**self.createVertexInitAttr(page))
-            g['title'][page.title] = visitedIndex
-            g['pageid'][page.pageid] = visitedIndex
-            g['category'].update(page.categories)
-
-            # add edges from newly visited vertex
-            lineColor = self.getViewMode().lineColor
-            for link in page.links:
-                otherVertexIndex = g['title'].get(link)
-                if otherVertexIndex is not None:  # to old vertices
-                    g.add_edge(visitedIndex, otherVertexIndex, color=lineColor, line=QPainterPath())
-                else:  # to new vertices
-                    g.add_vertex(**self.createVertexInitAttr(link))
-                    i = g.vcount() - 1
-                    g.add_edge(visitedIndex, i, color=lineColor, line=QPainterPath())
-                    g['title'][link] = i
-
-            # add to crawl
-            if self.searchAlgo == 'BFS':
-                self.toCrawl.extend(range(visitedIndex + 1, g.vcount()))
+            found, missing, retry = [], [], []
+            for visitedIndex, title in zip(batch, titles):
+                if title in failed:
+                    retry.append(visitedIndex)
+                elif title in pages:
+                    found.append((visitedIndex, pages[title]))
+                else:
+                    missing.append(visitedIndex)
+            applied, duplicates = self.addPages(found, self.getViewMode().lineColor, stop=True)
+            missing += duplicates
+
+            # pages which could not be fetched, e.g. when throttled, are crawled again
+            # rather than logged as missing
+            if len(retry) > 0:
+                self.toCrawl.requeue(retry)
+                failedBatches += 1
+                if failedBatches >= self.MAX_FAILED_BATCHES:
+                    print('%d batches in a row could not be fetched, stopping' % failedBatches)
+                    self.terminate = True
             else:
-                self.toCrawl.extendleft(range(g.vcount(), visitedIndex + 1, -1))
-                if self.searchAlgo == 'RAND':
-                    # randomly swap 1st element to somewhere
-                    i = randrange(0, len(self.toCrawl))
-                    self.toCrawl[i], self.toCrawl[0] = self.toCrawl[0], self.toCrawl[i]
+                failedBatches = 0
 
             # stuff
-            self.terminate = self.terminate or self.checkStopConditions() or len(self.toCrawl) == 0
-            sleep(self.delay)
+            self.terminate = self.terminate or self.checkStopConditions() or \
+                (len(self.toCrawl) == 0 and len(inFlight) == 0)
             self.timeElapsed += time() - startTime
+            self.checkpoint.addBatch(applied, missing, self.timeElapsed)
 
             # handle pause / resume
             self.pauseLock.acquire()
@@ -211,13 +356,83 @@ class CrawlMode(Mode, QObject):
             startTime = time()
             self.timeElapsed += time() - startTime
 
+        # pages still being fetched are dropped
+        pool.shutdown(wait=False, cancel_futures=True)
+        self.checkpoint.close()
+        self.closeCache()
         self.status = 'done'
         self.crawlDoneSignal.emit('done')
 
+    def addPages(self, pages, lineColor, stop=False):
+        """
+        Mark the vertices of *pages*, (visitedIndex, page) pairs, as visited with the content of
+        their page, add their links & queue them. Pages already in the graph under another title
+        are left out, and with *stop* so are the pages after the one meeting a stop condition.
+        A page may be the one of a vertex linked by an earlier page of *pages*, like when
+        replaying a checkpoint. Returns the pairs applied & the vertices left out
+        """
+        g = self.canvas.g
+        # all the pages are added with a single add_vertices & add_edges
+        # since each call rebuilds the indices of the graph
+        vcount = g.vcount()
+        newVertices, edges, toQueue = [], [], []
+        applied, missing = [], []
+        for visitedIndex, page in pages:
+            if page.pageid in g['pageid']:
+                missing.append(visitedIndex)
+                continue
+            if visitedIndex < vcount:
+                vertex = g.vs[visitedIndex]
+                vertex.update_attributes(**self.createVertexInitAttr(page))
+            else:
+                vertex = newVertices[visitedIndex - vcount]
+                vertex.update(self.createVertexInitAttr(page))
+            g['title'][page.title] = visitedIndex
+            g['pageid'][page.pageid] = visitedIndex
+            g['category'].update(page.categories)
+
+            # depth: number of links from the start page, as found so far
+            depth = vertex['depth'] + 1
+            linked = []
+            for link in page.links:
+                otherVertexIndex = g['title'].get(link)
+                if otherVertexIndex is None:  # to new vertices
+                    otherVertexIndex = g['title'][link] = vcount + len(newVertices)
+                    attrs = self.createVertexInitAttr(link)
+                    attrs['depth'] = depth
+                    newVertices.append(attrs)
+                elif otherVertexIndex >= vcount:  # to vertices new in this batch
+                    attrs = newVertices[otherVertexIndex - vcount]
+                    attrs['depth'] = min(attrs['depth'], depth)
+                elif g.vs[otherVertexIndex]['depth'] > depth:  # shorter path
+                    g.vs[otherVertexIndex]['depth'] = depth
+                linked.append(otherVertexIndex)
+            edges += [(visitedIndex, i) for i in linked]
+
+            # the links of pages at maxDepth would be deeper, so these pages are not crawled
+            if self.maxDepth is None or depth < self.maxDepth:
+                toQueue.append(linked)
+            applied.append((visitedIndex, page))
+            if stop and self.checkStopConditions(vcount + len(newVertices)):
+                break
+
+        if len(newVertices) > 0:
+            g.add_vertices(len(newVertices), {
+                attr: [attrs[attr] for attrs in newVertices] for attr in newVertices[0]
+            })
+        g.add_edges(edges, {'color': [lineColor] * len(edges)})
+
+        # add to crawl once the edges are in the graph, for the scores of the PRIORITY frontier,
+        # page by page to keep the search order. Vertices already queued or crawled are skipped
+        for linked in toQueue:
+            self.toCrawl.extend(linked)
+        return applied, missing
+
     def createVertexInitAttr(self, page):
         g = self.canvas.g
         viewMode = self.getViewMode()
-        visited = isinstance(page, wikipedia.WikipediaPage)
+        # pages are fetched objects, vertices which are not crawled yet only have a title
+        visited = not isinstance(page, str)
         attrs = {
             'color': viewMode.visitedPageColor if visited else viewMode.unvisitedPageColor,
             'visited': visited
@@ -234,26 +449,7 @@ class CrawlMode(Mode, QObject):
                 'pageid': '--',
                 'links': [],
                 'x': self.canvas.WIDTH / 2,
-                'y': self.canvas.HEIGHT / 2,
-                'pos': QPointF(
-                    self.canvas.toScaledX(self.canvas.WIDTH / 2),
-                    self.canvas.toScaledY(self.canvas.HEIGHT / 2)
-                )
-            })
-        if visited and g['loadDetails']:
-            attrs.update({
-                'summary': page.summary,
-                'wordCount': page.summary.replace('\n', ' ').count(' '),
-                'refCount': len(page.references),
-                'imgCount': len(page.images),
-                'catCount': len(page.categories)
-            })
-        else:
-            attrs.update({
-                'summary': 'Summary is not available',
-                'wordCount': 0,
-                'refCount': 0,
-                'imgCount': 0,
-                'catCount': 0,
+                'y': self.canvas.HEIGHT / 2
             })
+        attrs.update(detailAttrs(page) if visited and g['loadDetails'] else NO_DETAILS)
         return attrs
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic
+
+from PyQt5.QtCore import pyqtSignal, QObject
+
+from .WikiApi import WikiApiError
+
+NO_DETAILS = {
+    'summary': 'Summary is not available',
+    'wordCount': 0,
+    'refCount': 0,
+    'imgCount': 0,
+    'catCount': 0,
+}
+LOADING_DETAILS = dict(NO_DETAILS, summary='Loading summary...')
+
+
+def detailAttrs(page):
+    """
+    Vertex attributes given by the details of the fetched *page*
+    """
+    return {
+        'summary': page.summary,
+        'wordCount': page.summary.replace('\n', ' ').count(' '),
+        'refCount': len(page.references),
+        'imgCount': len(page.images),
+        'catCount': len(page.categories)
+    }
+
+
+def detailInfo(attrs):
+    """
+    Entries of the info panel showing the detail attributes *attrs*
+    """
+    return {
+        'pageRefCount': str(attrs['refCount']),
+        'pageImgCount': str(attrs['imgCount']),
+        'pageWordCount': str(attrs['wordCount']),
+        'pageCatCount': str(attrs['catCount']),
+        'pageSummary': attrs['summary'],
+    }
+
+
+class DetailLoader(QObject):
+    """
+    Details of the pages of graphs crawled with lazy details, fetched in the
+    background the first time they are asked for & kept for the last
+    *maxPages* pages used. Vertex attributes are left as they are, the details
+    only live here. detailsLoadedSignal gives the title & detail attributes of
+    each page once fetched, the attributes are NO_DETAILS when it failed. Pages
+    which failed are given NO_DETAILS for FAILURE_RETRY seconds before being
+    fetched again
+    """
+    MAX_PAGES = 1000
+    WORKERS = 2
+    FAILURE_RETRY = 30
+
+    detailsLoadedSignal = pyqtSignal(str, object)
+
+    def __init__(self, maxPages=MAX_PAGES):
+        super().__init__()
+        self.maxPages = maxPages
+        self.language = self.api = self.cache = None
+        self.pages = OrderedDict()  # (language, title) -> detail attributes, least recently used first
+        self.pending = set()
+        self.failed = OrderedDict()  # (language, title) -> monotonic time after which it is fetched again
+        self.lock = Lock()
+        self.pool = ThreadPoolExecutor(self.WORKERS, thread_name_prefix='details')
+
+    def setClients(self, language, api, cache=None):
+        """
+        Fetch pages of the *language* Wikipedia with *api*, sharing its rate limiter with
+        the crawl, & go through the PageCache *cache* first
+        """
+        self.language = language
+        self.api = api
+        self.cache = cache
+
+    def details(self, vertex):
+        """
+        Detail attributes of *vertex*. For lazy graphs, LOADING_DETAILS until they are fetched
+        """
+        g = vertex.graph
+        if not g['lazyDetails'] or not vertex['visited'] or self.api is None:
+            return {attr: vertex[attr] for attr in NO_DETAILS}
+
+        key = (self.language, vertex['title'])
+        with self.lock:
+            attrs = self.pages.get(key)
+            if attrs is not None:
+                self.pages.move_to_end(key)
+                return attrs
+            if key in self.failed:
+                if monotonic() < self.failed[key]:
+                    return NO_DETAILS
+                del self.failed[key]
+            if key not in self.pending:
+                self.pending.add(key)
+                self.pool.submit(self.load, self.api, self.cache, key)
+        return LOADING_DETAILS
+
+    def load(self, api, cache, key):
+        """
+        Run by the workers
+        """
+        language, title = key
+        attrs = NO_DETAILS
+        try:
+            pages = cache.get(language, [title], details=True) if cache else {}
+            if title not in pages:
+                pages = api.fetchPages([title], True)
+                if cache:
+                    cache.put(language, pages, details=True)
+            if title in pages:
+                attrs = detailAttrs(pages[title])
+        except WikiApiError as e:
+            print(e)
+
+        with self.lock:
+            self.pending.discard(key)
+            if attrs is not NO_DETAILS:
+                self.pages[key] = attrs
+                while len(self.pages) > self.maxPages:
+                    self.pages.popitem(last=False)
+            else:
+                self.failed[key] = monotonic() + self.FAILURE_RETRY
+                while len(self.failed) > self.maxPages:
+                    self.failed.popitem(last=False)
+        self.detailsLoadedSignal.emit(title, attrs)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
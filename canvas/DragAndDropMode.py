@@ -1,5 +1,6 @@
 from PyQt5.QtCore import QPointF, Qt, pyqtSignal, QObject
 
+from .DetailLoader import detailInfo
 from .Mode import Mode
 
 
@@ -14,6 +15,8 @@ class DragAndDropMode(Mode, QObject):
         QObject.__init__(self)
         Mode.__init__(self, canvas)
         self.backgroundDragging = None
+        self.vertexDragging = False
+        canvas.detailLoader.detailsLoadedSignal.connect(self.onDetailsLoaded)
 
     def onSetGraph(self):
         self.canvas.selectedVertices = []
@@ -26,16 +29,17 @@ class DragAndDropMode(Mode, QObject):
             'pageID': str(vertex['pageid']),
             'pageInLinkCount': str(vertex.indegree()),
             'pageOutLinkCount': str(vertex.outdegree()),
-            'pageRefCount': str(vertex['refCount']),
-            'pageImgCount': str(vertex['imgCount']),
-            'pageWordCount': str(vertex['wordCount']),
-            'pageCatCount': str(vertex['catCount']),
-            'pageSummary': vertex['summary'],
+            **detailInfo(self.canvas.detailLoader.details(vertex))
         })
         # self.gui.setPageInfoVisible(True)
         self.canvas.selectedVertices = [vertex]
         self.canvas.selectedEdges = []
 
+    def onDetailsLoaded(self, title, attrs):
+        # lazy details arrive after the vertex was selected, the info panel is updated if it still is
+        if len(self.canvas.selectedVertices) > 0 and self.canvas.selectedVertices[-1]['title'] == title:
+            self.vertexSelectedSignal.emit(detailInfo(attrs))
+
     def onSelectBackground(self, event):
         if event.button() == Qt.LeftButton:
             self.canvas.selectedVertices = []
@@ -53,10 +57,17 @@ class DragAndDropMode(Mode, QObject):
                 center.y() + (self.backgroundDragging.y() - pos.y()) / zoom,
             )
             self.backgroundDragging = pos
+            self.canvas.invalidate(self.canvas.DIRTY_VIEW)
         elif len(self.canvas.selectedVertices) > 0:
             vertex = self.canvas.selectedVertices[0]
-            vertex['x'] = self.canvas.toAbsoluteX(pos.x())
-            vertex['y'] = self.canvas.toAbsoluteY(pos.y())
+            if not self.vertexDragging:
+                # only the dragged vertex & its edges are updated until it is dropped
+                self.vertexDragging = True
+                self.canvas.setFloatingVertices([vertex.index])
+            self.canvas.setVertexXY(vertex.index, self.canvas.toAbsoluteX(pos.x()), self.canvas.toAbsoluteY(pos.y()))
 
     def onMouseRelease(self, event):
         self.backgroundDragging = None
+        if self.vertexDragging:
+            self.vertexDragging = False
+            self.canvas.setFloatingVertices([])
@@ -0,0 +1,276 @@
+import gzip
+import os
+import re
+import sys
+from array import array
+
+import numpy as np
+from igraph import Graph
+
+# values in the rows of INSERT statements, strings may contain any character
+SQL_STRING = r"'([^'\\]*(?:\\.[^'\\]*)*)'"
+SQL_VALUE = r"(?:'[^'\\]*(?:\\.[^'\\]*)*'|[^,()']*)"
+SQL_ESCAPE = re.compile(r'\\(.)')
+SQL_ESCAPES = {'0': '\0', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+SQL_COLUMN = re.compile(r'^\s*`(\w+)` (\w+)')
+SQL_STRING_TYPES = {'char', 'varchar', 'binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'text'}
+
+
+class DumpImportError(Exception):
+    pass
+
+
+def openDump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def dumpPosition(f):
+    """
+    Bytes of the file read so far, compressed ones for gzip files
+    """
+    raw = f.buffer
+    return raw.fileobj.tell() if isinstance(raw, gzip.GzipFile) else raw.tell()
+
+
+def unescape(value):
+    return SQL_ESCAPE.sub(lambda match: SQL_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def printProgress(path, fraction, rows):
+    print('%s: %3d%%, %d rows' % (path, fraction * 100, rows), file=sys.stderr)
+
+
+class DumpImporter:
+    """
+    Builds the graph of the articles of a Wikipedia from its database dumps,
+    without any network: the page table and the pagelinks table (plus the
+    linktarget table for dumps where pagelinks only has pl_target_id).
+    Tables are MySQL dumps (.sql or .sql.gz) read as a stream, or TSV files
+    (.tsv or .tsv.gz) with the columns page_id, page_title of the articles and
+    pl_from, pl_title of the links to articles.
+
+    Only articles (namespace 0) which are not redirects are kept, links to
+    redirects are dropped. Vertices have the title / pageid / visited attributes
+    of the crawled graphs, pageids being strings.
+
+    Restricted to the pages at most *hops* links away from a start page, each
+    hop takes one pass over pagelinks (& linktarget) and one over page, and only
+    the pages reached are held in memory. Pages at the last hop are not
+    visited, like the pages the crawler has not fetched yet
+    """
+    PROGRESS_STEP = 0.05
+
+    def __init__(self, page, pagelinks, linktarget=None, progress=printProgress):
+        self.pagePath = page
+        self.pagelinksPath = pagelinks
+        self.linktargetPath = linktarget
+        self.progress = progress
+
+    @staticmethod
+    def isTsv(path):
+        return path.endswith('.tsv') or path.endswith('.tsv.gz')
+
+    @staticmethod
+    def title(title):
+        return title.replace('_', ' ')
+
+    def rows(self, path, columns):
+        """
+        Tuples of the values of *columns* in the rows of the table at *path*, as strings
+        """
+        size = os.path.getsize(path) or 1
+        tsv = self.isTsv(path)
+        if not tsv:
+            table = self.columns(path)
+            names = [name for name, _ in table]
+            missing = [column for column in columns if column not in names]
+            if missing:
+                raise DumpImportError('%s has no column %s' % (path, ', '.join(missing)))
+            indices = [names.index(column) for column in columns]
+            captured = sorted(indices)
+            order = None if captured == indices else [captured.index(i) for i in indices]
+            strings = [k for k, i in enumerate(captured) if table[i][1]]
+
+            # a whole row is matched, capturing *columns* only & strings without quotes,
+            # so that a line is split in a single findall
+            patterns = []
+            for i, (_, string) in enumerate(table):
+                if i not in indices:
+                    patterns.append(SQL_VALUE)
+                elif string:
+                    patterns.append("(?:%s|NULL)" % SQL_STRING)
+                else:
+                    patterns.append('(%s)' % SQL_VALUE)
+            sqlRow = re.compile(r'\(' + ','.join(patterns) + r'\)')
+
+        count = 0
+        reported = 0
+        with openDump(path) as f:
+            for line in f:
+                if tsv:
+                    count += 1
+                    yield tuple(line.rstrip('\n').split('\t', len(columns) - 1))
+                    if count % 100000 != 0:
+                        continue
+                elif line.startswith('INSERT INTO'):
+                    rows = sqlRow.findall(line, line.index('('))
+                    count += len(rows)
+                    for row in rows:
+                        if len(captured) == 1:
+                            row = (row,)
+                        for k in strings:
+                            if '\\' in row[k]:
+                                row = tuple(unescape(value) if j in strings else value for j, value in enumerate(row))
+                                break
+                        yield row if order is None else tuple(row[k] for k in order)
+                else:
+                    continue
+
+                # the end is reported once the whole file is read
+                fraction = dumpPosition(f) / size
+                if fraction < 1 and fraction - reported >= self.PROGRESS_STEP:
+                    self.progress(path, fraction, count)
+                    reported = fraction
+        self.progress(path, 1, count)
+
+    @staticmethod
+    def columns(path):
+        """
+        (name, is a string) of the columns of the table of the MySQL dump at *path*
+        """
+        table = []
+        with openDump(path) as f:
+            for line in f:
+                match = SQL_COLUMN.match(line)
+                if match:
+                    table.append((match.group(1), match.group(2).lower() in SQL_STRING_TYPES))
+                elif line.startswith('INSERT INTO'):
+                    break
+        return table
+
+    def pages(self, titles=None):
+        """
+        (pageid, title) of the articles, only the ones titled *titles* if given
+        """
+        if self.isTsv(self.pagePath):
+            rows = ((pageid, '0', title, '0') for pageid, title in self.rows(self.pagePath, ['page_id', 'page_title']))
+        else:
+            rows = self.rows(self.pagePath, ['page_id', 'page_namespace', 'page_title', 'page_is_redirect'])
+        for pageid, namespace, title, redirect in rows:
+            if namespace != '0' or redirect != '0':
+                continue
+            title = self.title(title)
+            if titles is None or title in titles:
+                yield pageid, title
+
+    def linkTargets(self, ids=None):
+        """
+        Dict from the ids of linktarget to the titles of the articles, only for *ids* if given
+        """
+        if self.linktargetPath is None:
+            raise DumpImportError('pagelinks refers to linktarget, which is not given')
+        targets = {}
+        for targetId, namespace, title in self.rows(self.linktargetPath, ['lt_id', 'lt_namespace', 'lt_title']):
+            if namespace == '0' and (ids is None or targetId in ids):
+                targets[targetId] = self.title(title)
+        return targets
+
+    def links(self, fromIds=None):
+        """
+        (pageid, title) of the links to articles, only the ones from the pages *fromIds* if given
+        """
+        path = self.pagelinksPath
+        if self.isTsv(path):
+            for fromId, title in self.rows(path, ['pl_from', 'pl_title']):
+                if fromIds is None or fromId in fromIds:
+                    yield fromId, self.title(title)
+            return
+
+        if 'pl_title' in dict(self.columns(path)):  # older dumps
+            for fromId, namespace, title in self.rows(path, ['pl_from', 'pl_namespace', 'pl_title']):
+                if namespace == '0' and (fromIds is None or fromId in fromIds):
+                    yield fromId, self.title(title)
+            return
+
+        # newer dumps, links point to rows of linktarget
+        if fromIds is None:
+            targets = self.linkTargets()
+            for fromId, targetId in self.rows(path, ['pl_from', 'pl_target_id']):
+                title = targets.get(targetId)
+                if title is not None:
+                    yield fromId, title
+            return
+        links = [(fromId, targetId) for fromId, targetId in self.rows(path, ['pl_from', 'pl_target_id'])
+                 if fromId in fromIds]
+        targets = self.linkTargets({targetId for _, targetId in links})
+        for fromId, targetId in links:
+            if targetId in targets:
+                yield fromId, targets[targetId]
+
+    def build(self, start=None, hops=2):
+        """
+        Graph of all the articles, or of the ones at most *hops* links away from the article *start*
+        """
+        if start is None:
+            return self.buildAll()
+        return self.buildNeighbourhood(self.title(start), hops)
+
+    def buildAll(self):
+        pageids, titles = [], []
+        indexById, indexByTitle = {}, {}
+        for pageid, title in self.pages():
+            indexById[pageid] = indexByTitle[title] = len(pageids)
+            pageids.append(pageid)
+            titles.append(title)
+
+        edges = array('q')
+        for fromId, title in self.links():
+            source, target = indexById.get(fromId), indexByTitle.get(title)
+            if source is not None and target is not None:
+                edges.append(source)
+                edges.append(target)
+        return self.createGraph(pageids, titles, [True] * len(pageids), edges)
+
+    def buildNeighbourhood(self, start, hops):
+        found = list(self.pages({start}))
+        if len(found) == 0:
+            raise DumpImportError('No article titled ' + start)
+
+        pageids, titles, depths = [found[0][0]], [start], [0]
+        indexByTitle = {start: 0}
+        edges = array('q')
+        frontier = {found[0][0]}
+        for depth in range(1, hops + 1):
+            links = list(self.links(frontier))
+            newTitles = {title for _, title in links if title not in indexByTitle}
+            frontier = set()
+            for pageid, title in self.pages(newTitles):
+                indexByTitle[title] = len(pageids)
+                pageids.append(pageid)
+                titles.append(title)
+                depths.append(depth)
+                frontier.add(pageid)
+
+            indexById = {pageid: i for i, pageid in enumerate(pageids)}
+            for fromId, title in links:
+                target = indexByTitle.get(title)
+                if target is not None:
+                    edges.append(indexById[fromId])
+                    edges.append(target)
+
+        g = self.createGraph(pageids, titles, [depth < hops for depth in depths], edges)
+        g.vs['depth'] = depths
+        return g
+
+    @staticmethod
+    def createGraph(pageids, titles, visited, edges):
+        g = Graph(n=len(pageids), edges=np.frombuffer(edges, dtype=np.int64).reshape(-1, 2), directed=True)
+        g.vs['title'] = titles
+        g.vs['pageid'] = pageids
+        g.vs['visited'] = visited
+        g.vs['summary'] = 'Summary is not available'
+        for attr in ['wordCount', 'refCount', 'imgCount', 'catCount']:
+            g.vs[attr] = 0
+        return g
@@ -0,0 +1,152 @@
+from math import cos, sin, pi
+
+import numpy as np
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QImage
+
+from .utils import toPolygonF, groupByColor, cosmeticPen
+
+
+class EdgeRenderer:
+    """
+    Draws edges in batches: one drawLines call per pen color for the shafts &
+    arrowhead outlines, and one polygon holding the fill of the arrowheads.
+    Batches hold at most BATCH_SIZE segments / arrowheads, so that drawing can
+    be interrupted between them (see paintBatches)
+    """
+
+    BATCH_SIZE = 2048
+    DENSITY_SCALE = 0.5
+    DENSITY_MAX_SAMPLES = 128
+
+    def __init__(self):
+        self.groups = []
+        self.heads = []
+        self.density = None
+
+    def build(self, lines, heads, colors=None):
+        """
+        *lines*: (n, k, 4) segments to stroke for each edge
+        *heads*: (n, 3, 2) arrowhead triangles
+        *colors*: n QColor, pen of each edge. If None, the edges are stroked with the current pen
+        """
+        self.density = None
+        self.heads = [
+            toPolygonF(stitchTriangles(heads[start:start + self.BATCH_SIZE]))
+            for start in range(0, len(heads), self.BATCH_SIZE)
+        ]
+        batchSize = max(1, self.BATCH_SIZE // max(lines.shape[1], 1))
+        if colors is None:
+            self.groups = [(None, toPolygonF(lines))]
+        else:
+            self.groups = groupByColor(colors, lines, batchSize)
+
+    def buildDensity(self, segments, rect, zoom, color):
+        """
+        Accumulate the (n, 4) *segments* into an image of *rect* (absolute
+        coordinates) at *zoom*, where the opacity of a pixel grows with the log
+        of the number of edges through it
+        """
+        scale = zoom * self.DENSITY_SCALE
+        self.groups = []
+        self.heads = []
+        self.density = densityImage(
+            (segments - [rect.x(), rect.y(), rect.x(), rect.y()]) * scale,
+            max(1, int(rect.width() * scale)),
+            max(1, int(rect.height() * scale)),
+            color, self.DENSITY_MAX_SAMPLES
+        )
+        self.densityRect = QRectF(rect)
+
+    def paint(self, painter):
+        for _ in self.paintBatches(painter):
+            pass
+
+    def paintBatches(self, painter):
+        """
+        Generator drawing one batch per step
+        """
+        if self.density is not None:
+            painter.drawImage(self.densityRect, self.density)
+            return
+
+        # the brush set by the modes fills the arrowheads, as it would for a path
+        pen = painter.pen()
+        painter.setPen(Qt.NoPen)
+        for heads in self.heads:
+            painter.drawPolygon(heads, Qt.WindingFill)
+            yield
+        painter.setPen(pen)
+
+        for color, lines in self.groups:
+            if color is not None:
+                painter.setPen(cosmeticPen(color))
+            painter.drawLines(lines)
+            yield
+
+
+def stitchTriangles(triangles):
+    """
+    Chain triangles into a single polygon. Every triangle is reached from the
+    same anchor point and left the same way, so the connecting spokes have no
+    area. All triangles have the same orientation, so they add up with WindingFill
+    """
+    n = len(triangles)
+    if n == 0:
+        return np.empty((0, 2))
+    points = np.empty((n, 5, 2))
+    points[:, 0] = triangles[0, 0]
+    points[:, 1:4] = triangles
+    points[:, 4] = triangles[:, 0]
+    return points.reshape(-1, 2)
+
+
+def arrowHeads(xStart, yStart, xEnd, yEnd, arrowSize, pointRadius):
+    """
+    Arrowhead triangles (n, 3, 2) of the arrows from start to end, computed for all arrows at once.
+    The tip is moved back from the end by half the point radius, the two other
+    corners are at *arrowSize* from the tip, 30 degrees on each side of the shaft
+    """
+    dx, dy = xStart - xEnd, yStart - yEnd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        length = np.hypot(dx, dy)
+        ux, uy = dx / length, dy / length
+
+    heads = np.empty((len(ux), 3, 2))
+    heads[:, 0, 0] = tipX = xEnd + ux * pointRadius / 2
+    heads[:, 0, 1] = tipY = yEnd + uy * pointRadius / 2
+    c, s = arrowSize * cos(pi / 6), arrowSize * sin(pi / 6)
+    heads[:, 1, 0] = tipX + ux * c + uy * s
+    heads[:, 1, 1] = tipY + uy * c - ux * s
+    heads[:, 2, 0] = tipX + ux * c - uy * s
+    heads[:, 2, 1] = tipY + uy * c + ux * s
+    return heads
+
+
+def arrowLines(starts, heads):
+    """
+    Segments stroked for each arrow: the shaft from *starts* to the tip, then the outline of the head
+    """
+    tips, bs, cs = heads[:, 0], heads[:, 1], heads[:, 2]
+    return np.stack([
+        np.hstack([starts, tips]),
+        np.hstack([tips, bs]),
+        np.hstack([bs, cs]),
+        np.hstack([cs, tips])
+    ], axis=1)
+
+
+def densityImage(segments, width, height, color, maxSamples):
+    x0, y0, x1, y1 = segments.T
+    samples = np.clip(np.ceil(np.nan_to_num(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0)))), 1, maxSamples)
+    samples = samples.astype(np.int64)
+    edges = np.repeat(np.arange(len(x0)), samples)
+    t = (np.arange(len(edges)) - np.repeat(np.cumsum(samples) - samples, samples)) / np.repeat(samples, samples)
+    xs = (x0[edges] + (x1 - x0)[edges] * t).astype(np.int64)
+    ys = (y0[edges] + (y1 - y0)[edges] * t).astype(np.int64)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+    counts = np.bincount(ys[inside] * width + xs[inside], minlength=width * height)
+    alpha = np.log1p(counts) / max(np.log1p(counts.max()), 1e-9) * 255
+    pixels = (alpha.astype(np.uint32) << 24) | (color.rgb() & 0xffffff)
+    return QImage(pixels.astype(np.uint32).tobytes(), width, height, width * 4, QImage.Format_ARGB32).copy()
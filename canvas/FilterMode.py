@@ -32,21 +32,19 @@ class FilterMode(Mode):
         else:
             shouldBeDrawn = lambda v: False if v[self.attr] is None else self.min <= v[self.attr] <= self.max
         canvas = self.canvas
-        toDraw = []
-        toHide = set()
-        for v in canvas.g.vs:
-            if shouldBeDrawn(v):
-                toDraw.append(v)
-            else:
-                toHide.add(v.index)
-        canvas.verticesToDraw = toDraw
-        toDraw = []
-        for e in canvas.g.es:
-            if not (e.source in toHide or e.target in toHide):
-                toDraw.append(e)
-        canvas.edgesToDraw = toDraw
+        vs = canvas.g.vs
+        drawn = {}
+
+        def isDrawn(index):
+            if index not in drawn:
+                drawn[index] = shouldBeDrawn(vs[index])
+            return drawn[index]
+
+        canvas.verticesToDraw = [v for v in canvas.verticesToDraw if isDrawn(v.index)]
+        canvas.edgesToDraw = [e for e in canvas.edgesToDraw if isDrawn(e.source) and isDrawn(e.target)]
 
     def setFilter(self, attr, minValue, maxValue):
         self.attr = attr
         self.min = minValue
         self.max = maxValue
+        self.canvas.invalidate(self.canvas.DIRTY_VISIBILITY)
@@ -0,0 +1,112 @@
+from collections import deque
+from heapq import heapify, heappush, heappop
+from itertools import count
+from random import randrange
+
+FRONTIER_ORDERS = ['BFS', 'DFS', 'RAND', 'PRIORITY']
+
+
+class Frontier:
+    """
+    Vertices left to crawl. A vertex is queued at most once, whatever the
+    number of times it is pushed, so memory is linear in the number of
+    discovered vertices. Popping order:
+        BFS: first pushed first
+        DFS: last pushed first, vertices pushed together come out in the order given
+        RAND: random
+        PRIORITY: highest *score(vertex)* first. Pushing a queued vertex again
+            updates its score, e.g. when its in-degree grows
+    """
+
+    def __init__(self, order='BFS', score=None):
+        if order not in FRONTIER_ORDERS:
+            raise ValueError('Unknown frontier order ' + order)
+        if order == 'PRIORITY' and score is None:
+            raise ValueError('PRIORITY frontier needs a score function')
+        self.order = order
+        self.score = score
+        self.seen = set()
+        self.queue = deque() if order in ['BFS', 'DFS'] else []
+        # PRIORITY only: latest score of each queued vertex, heap entries with an older one are stale
+        self.scores = {}
+        self.counter = count()
+
+    def __len__(self):
+        return len(self.scores) if self.order == 'PRIORITY' else len(self.queue)
+
+    def __contains__(self, vertex):
+        return vertex in self.seen
+
+    def push(self, vertex):
+        self.extend([vertex])
+
+    def extend(self, vertices):
+        if self.order == 'PRIORITY':
+            for vertex in vertices:
+                if vertex in self.seen and vertex not in self.scores:
+                    continue  # already popped
+                self.seen.add(vertex)
+                score = self.score(vertex)
+                if self.scores.get(vertex) != score:
+                    self.scores[vertex] = score
+                    heappush(self.queue, (-score, next(self.counter), vertex))
+            if len(self.queue) > 2 * len(self.scores):
+                self.compact()
+            return
+
+        # in the order given, without the vertices given several times
+        new = [vertex for vertex in dict.fromkeys(vertices) if vertex not in self.seen]
+        self.seen.update(new)
+        if self.order == 'DFS':
+            self.queue.extend(reversed(new))
+        else:
+            self.queue.extend(new)
+
+    def requeue(self, vertices):
+        """
+        Queue popped *vertices* again, e.g. when their pages could not be fetched. BFS & DFS pop them next
+        """
+        if self.order == 'PRIORITY':
+            for vertex in vertices:
+                score = self.score(vertex)
+                self.scores[vertex] = score
+                heappush(self.queue, (-score, next(self.counter), vertex))
+        elif self.order == 'BFS':
+            self.queue.extendleft(reversed(vertices))
+        else:
+            self.queue.extend(reversed(vertices))
+
+    def compact(self):
+        """
+        PRIORITY only: drop the stale heap entries, so that the heap stays linear in the queued vertices
+        """
+        self.queue = [(-score, next(self.counter), vertex) for vertex, score in self.scores.items()]
+        heapify(self.queue)
+
+    def remove(self, vertices):
+        """
+        Take *vertices* out of the queue, they are still seen. Linear in the size of the queue
+        """
+        vertices = set(vertices)
+        if self.order == 'PRIORITY':
+            for vertex in vertices:
+                self.scores.pop(vertex, None)  # its heap entries are now stale
+            self.compact()
+        else:
+            self.queue = type(self.queue)(vertex for vertex in self.queue if vertex not in vertices)
+
+    def pop(self):
+        if self.order == 'BFS':
+            return self.queue.popleft()
+        if self.order == 'DFS':
+            return self.queue.pop()
+        if self.order == 'RAND':
+            i = randrange(len(self.queue))
+            self.queue[i], self.queue[-1] = self.queue[-1], self.queue[i]
+            return self.queue.pop()
+
+        while True:
+            score, _, vertex = heappop(self.queue)
+            if self.scores.get(vertex) == -score:
+                del self.scores[vertex]
+                return vertex
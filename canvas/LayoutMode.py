@@ -1,3 +1,5 @@
+import numpy as np
+
 from .Mode import Mode
 
 LAYOUT_OPTIONS = [
@@ -15,32 +17,35 @@ LAYOUT_OPTIONS = [
 ]
 
 
+def layoutToXY(layout):
+    coords = np.array(layout.coords, dtype=float).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
 class LayoutMode(Mode):
     priority = 2
 
     def __init__(self, canvas):
         super().__init__(canvas)
         self.layoutName = 'layout_circle'
-        self.initXY = None
+        self.initXY = (np.empty(0), np.empty(0))
 
     def onSetGraph(self):
         g = self.canvas.g
         if g.vcount() == 0:
+            self.initXY = (np.empty(0), np.empty(0))
             return
 
         # if xy not in graph data, use default layout
         vsAttributes = g.vs.attributes()
         if 'x' not in vsAttributes or 'y' not in vsAttributes:
-            layout = g.layout_reingold_tilford_circular()
-            for c, v in zip(layout.coords, g.vs):
-                v['x'] = c[0]
-                v['y'] = c[1]
+            self.canvas.setVerticesXY(*layoutToXY(g.layout_reingold_tilford_circular()))
 
         # fit coordinates to screen
         self.onResetViewRect()
 
         # backup
-        self.initXY = {v: (v['x'], v['y']) for v in self.canvas.g.vs}
+        self.initXY = (self.canvas.xs.copy(), self.canvas.ys.copy())
 
         self.applyLayout()
 
@@ -48,51 +53,45 @@ class LayoutMode(Mode):
         self.applyLayout()
 
     def onResetViewRect(self):
-        g = self.canvas.g
+        canvas = self.canvas
+        g = canvas.g
         if g.vcount() == 0:
             return
 
         if g.vcount() == 1:
-            v = g.vs[0]
-            v['x'] = self.canvas.WIDTH / 2
-            v['y'] = self.canvas.HEIGHT / 2
+            canvas.setVerticesXY([canvas.WIDTH / 2], [canvas.HEIGHT / 2])
             return
 
         # use same origin
-        mx = min(g.vs['x'])
-        my = min(g.vs['y'])
-        g.vs['x'] = [x - mx for x in g.vs['x']]
-        g.vs['y'] = [y - my for y in g.vs['y']]
+        xs = canvas.xs - canvas.xs.min()
+        ys = canvas.ys - canvas.ys.min()
 
         # fit rect in screen rect
-        mx = max(g.vs['x'])
-        my = max(g.vs['y'])
-        scale = min(self.canvas.WIDTH / mx, self.canvas.HEIGHT / my)
+        mx = xs.max()
+        my = ys.max()
+        scale = min(canvas.WIDTH / mx, canvas.HEIGHT / my)
 
         # align center
-        dx = (self.canvas.WIDTH - mx * scale) / 2.0
-        dy = (self.canvas.HEIGHT - my * scale) / 2.0
-        
-        g.vs['x'] = [x * scale + dx for x in g.vs['x']]
-        g.vs['y'] = [y * scale + dy for y in g.vs['y']]
+        dx = (canvas.WIDTH - mx * scale) / 2.0
+        dy = (canvas.HEIGHT - my * scale) / 2.0
+
+        canvas.setVerticesXY(xs * scale + dx, ys * scale + dy)
 
     def applyLayout(self):
+        canvas = self.canvas
         if self.layoutName == 'auto':
-            for v in self.canvas.g.vs:
-                coor = self.initXY.get(v)
-                if coor:
-                    v['x'] = coor[0]
-                    v['y'] = coor[1]
-                else:
-                    v['x'] = self.canvas.toAbsoluteX(self.canvas.WIDTH / 2)
-                    v['y'] = self.canvas.toAbsoluteY(self.canvas.HEIGHT / 2)
-                    self.initXY[v] = (v['x'], v['y'])
+            initXs, initYs = self.initXY
+            newVertexCount = canvas.g.vcount() - len(initXs)
+            if newVertexCount > 0:
+                # new vertices start at the center of the screen
+                initXs = np.concatenate([initXs, np.full(newVertexCount, canvas.toAbsoluteX(canvas.WIDTH / 2))])
+                initYs = np.concatenate([initYs, np.full(newVertexCount, canvas.toAbsoluteY(canvas.HEIGHT / 2))])
+                self.initXY = (initXs, initYs)
+            canvas.setVerticesXY(initXs[:canvas.g.vcount()], initYs[:canvas.g.vcount()])
         else:
-            layout = getattr(self.canvas.g, self.layoutName)()
-            for c, v in zip(layout.coords, self.canvas.g.vs):
-                v['x'] = c[0]
-                v['y'] = c[1]
-        self.canvas.resetViewRect()
+            layout = getattr(canvas.g, self.layoutName)()
+            canvas.setVerticesXY(*layoutToXY(layout))
+        canvas.resetViewRect()
 
     def setLayout(self, layoutName):
         self.layoutName = layoutName
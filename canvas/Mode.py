@@ -1,3 +1,12 @@
+# hooks called on the modes by Canvas.dispatch, onSet & onUnset are called on a single mode
+HOOKS = [
+    'onSetGraph', 'onNewVerticesAdded', 'onResetViewRect', 'onUpdateViewRect',
+    'onPaintBegin', 'beforePaintEdges', 'beforePaintVertices', 'beforePaintSelectedEdges',
+    'beforePaintSelectedVertices', 'onSelectVertex', 'onSelectEdge', 'onSelectBackground',
+    'onMouseMove', 'onMouseRelease', 'onClose'
+]
+
+
 class Mode:
     conflict_modes = []
     priority = None
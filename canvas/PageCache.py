@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+from time import time
+
+from .WikiApi import WikiPage
+
+
+class PageCache:
+    """
+    Pages fetched by WikiApi kept in an SQLite file for *ttl* seconds, keyed by
+    language & pageid. Every title a page was asked for (unnormalized titles,
+    redirects) points to it. Past *maxPages* pages, the oldest ones are dropped.
+    Can be shared by threads; once closed, it finds nothing & stores nothing
+    """
+
+    def __init__(self, path='cache/pages.sqlite', ttl=7 * 24 * 3600, maxPages=200000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.maxPages = maxPages
+        self.hits = self.misses = 0
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS pages (
+                language TEXT, pageid TEXT, fetched REAL, details INTEGER, data TEXT,
+                PRIMARY KEY (language, pageid)
+            );
+            CREATE INDEX IF NOT EXISTS pagesFetched ON pages (fetched);
+            CREATE TABLE IF NOT EXISTS titles (
+                language TEXT, title TEXT, pageid TEXT,
+                PRIMARY KEY (language, title)
+            );
+        ''')
+        self.purge()
+
+    def purge(self):
+        """
+        Drop the expired pages and the titles pointing to dropped pages
+        """
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM pages WHERE fetched < ?', (time() - self.ttl,))
+            self.deleteOrphanTitles()
+
+    def deleteOrphanTitles(self):
+        self.db.execute('''
+            DELETE FROM titles WHERE NOT EXISTS (
+                SELECT 1 FROM pages WHERE pages.language = titles.language AND pages.pageid = titles.pageid
+            )
+        ''')
+
+    def get(self, language, titles, details=False):
+        """
+        Dict from each of *titles* found in the cache to its WikiPage. With *details*,
+        pages which were fetched without their details are left out
+        """
+        titles = list(titles)
+        if len(titles) == 0:
+            return {}
+        with self.lock:
+            if self.db is None:
+                return {}
+            rows = self.db.execute('''
+                SELECT titles.title, pages.data FROM titles
+                JOIN pages ON pages.language = titles.language AND pages.pageid = titles.pageid
+                WHERE titles.language = ? AND titles.title IN (%s) AND pages.fetched >= ? AND pages.details >= ?
+            ''' % ','.join('?' * len(titles)), (language, *titles, time() - self.ttl, int(details))).fetchall()
+            self.hits += len(rows)
+            self.misses += len(titles) - len(rows)
+        return {title: self.toPage(data) for title, data in rows}
+
+    def put(self, language, pages, details=False):
+        """
+        Store *pages*, a dict from the titles asked for to WikiPages as given by WikiApi.fetchPages
+        """
+        if len(pages) == 0:
+            return
+        now = time()
+        byId = {page.pageid: page for page in pages.values()}
+        titles = [(language, title, page.pageid) for title, page in pages.items()]
+        titles += [(language, page.title, page.pageid) for page in byId.values()]
+        with self.lock:
+            if self.db is None:
+                return
+            with self.db:
+                self.db.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)', [
+                    (language, pageid, now, int(details), json.dumps(vars(page))) for pageid, page in byId.items()
+                ])
+                self.db.executemany('INSERT OR REPLACE INTO titles VALUES (?, ?, ?)', titles)
+                excess = self.db.execute('SELECT COUNT(*) FROM pages').fetchone()[0] - self.maxPages
+                if excess > 0:
+                    self.db.execute(
+                        'DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY fetched LIMIT ?)',
+                        (excess,)
+                    )
+                    self.deleteOrphanTitles()
+
+    @staticmethod
+    def toPage(data):
+        return WikiPage.fromDict(json.loads(data))
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,93 @@
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+import numpy as np
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QFont, QFontMetrics
+
+NULL_SECTION = nullcontext()
+
+
+class Profiler:
+    """
+    Rolling timings of the stages of a frame and of the mode hooks, in
+    milliseconds. When disabled, section() returns a shared no-op context
+    and the hooks are not wrapped at all (see Canvas.updateHooks)
+    """
+    WINDOW = 240
+    PERCENTILES = [50, 95, 99]
+
+    def __init__(self):
+        self.enabled = False
+        self.overlay = False
+        self.timings = {}
+
+    def reset(self):
+        self.timings = {}
+
+    def record(self, name, seconds):
+        if name not in self.timings:
+            self.timings[name] = deque(maxlen=self.WINDOW)
+        self.timings[name].append(seconds * 1000)
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        return self.timed(name)
+
+    @contextmanager
+    def timed(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def wrap(self, name, func):
+        def timedFunc(*args):
+            start = perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.record(name, perf_counter() - start)
+
+        return timedFunc
+
+    def stats(self):
+        """
+        (name, count, p50, p95, p99, max) of every timed section, slowest p95 first
+        """
+        rows = []
+        for name, samples in list(self.timings.items()):
+            samples = np.array(samples)
+            if len(samples) == 0:
+                continue
+            rows.append((name, len(samples), *np.percentile(samples, self.PERCENTILES), samples.max()))
+        return sorted(rows, key=lambda row: -row[3])
+
+    def lines(self):
+        lines = ['%-40s %5s %8s %8s %8s %8s' % ('section (ms)', 'n', 'p50', 'p95', 'p99', 'max')]
+        for name, count, p50, p95, p99, maximum in self.stats():
+            lines.append('%-40s %5d %8.2f %8.2f %8.2f %8.2f' % (name[:40], count, p50, p95, p99, maximum))
+        return lines
+
+    def dump(self):
+        print('\n'.join(self.lines()))
+
+    def paintOverlay(self, painter):
+        """
+        Table of the timings in the top left corner, *painter* maps to the screen
+        """
+        lines = self.lines()
+        painter.save()
+        font = QFont('Monospace', 8)
+        font.setStyleHint(QFont.TypeWriter)
+        painter.setFont(font)
+        metrics = QFontMetrics(font)
+        rect = QRectF(0, 0, max(metrics.horizontalAdvance(line) for line in lines) + 8,
+                      metrics.lineSpacing() * len(lines) + 8)
+        painter.fillRect(rect, QColor(0, 0, 0, 160))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(rect.adjusted(4, 4, -4, -4), Qt.AlignLeft | Qt.AlignTop, '\n'.join(lines))
+        painter.restore()
@@ -0,0 +1,95 @@
+from collections import deque
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the crawl workers: at most *rate* requests per second
+    on average, in bursts of up to *burst* requests.
+
+    The rate adapts AIMD style: it is multiplied by DECREASE when the server
+    throttles (HTTP 429 / 503) or when a response is LATENCY_FACTOR times and
+    LATENCY_RISE seconds slower than usual, at most once per COOLDOWN seconds, and grows back by INCREASE
+    per normal response, up to *rate*. A throttled response also empties the
+    bucket, and no request is sent before the Retry-After delay it gives
+    """
+    MIN_RATE = 0.1
+    DECREASE = 0.5
+    INCREASE = 0.05
+    COOLDOWN = 1
+    LATENCY_FACTOR = 2
+    LATENCY_RISE = 0.2
+    LATENCY_SMOOTHING = 0.1
+    WINDOW = 10
+
+    def __init__(self, rate=2, burst=4):
+        self.maxRate = max(self.MIN_RATE, float(rate))
+        self.rate = self.maxRate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.lastRefill = monotonic()
+        self.lastDecrease = 0
+        self.latency = None
+        self.sent = deque()
+        self.started = monotonic()
+        self.lock = Lock()
+
+    def refill(self, now):
+        # no token is added before lastRefill, which is in the future during a Retry-After delay
+        if now > self.lastRefill:
+            self.tokens = min(self.burst, self.tokens + (now - self.lastRefill) * self.rate)
+            self.lastRefill = now
+
+    def acquire(self):
+        """
+        Block until a request can be sent
+        """
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.sent.append(now)
+                    return
+                wait = max(self.lastRefill - now, 0) + (1 - self.tokens) / self.rate
+            sleep(wait)
+
+    def onResponse(self, latency, throttled=False, retryAfter=None):
+        """
+        Adapt the rate to a response which took *latency* seconds, throttled ones
+        may ask to wait *retryAfter* seconds
+        """
+        with self.lock:
+            now = monotonic()
+            if throttled:
+                self.refill(now)
+                self.tokens = min(self.tokens, 0)
+                if retryAfter is not None:
+                    self.lastRefill = max(self.lastRefill, now + retryAfter)
+            slow = self.latency is not None and latency > max(
+                self.LATENCY_FACTOR * self.latency, self.latency + self.LATENCY_RISE)
+            if throttled or slow:
+                if now - self.lastDecrease >= self.COOLDOWN:
+                    self.refill(now)
+                    self.rate = max(self.MIN_RATE, self.rate * self.DECREASE)
+                    self.lastDecrease = now
+            else:
+                self.refill(now)
+                self.rate = min(self.maxRate, self.rate + self.INCREASE)
+            if not throttled:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency += self.LATENCY_SMOOTHING * (latency - self.latency)
+
+    def effectiveRate(self):
+        """
+        Requests per second actually sent over the last WINDOW seconds
+        """
+        with self.lock:
+            now = monotonic()
+            while self.sent and self.sent[0] < now - self.WINDOW:
+                self.sent.popleft()
+            return len(self.sent) / max(1, min(self.WINDOW, now - self.started))
@@ -0,0 +1,268 @@
+from math import sqrt
+
+import numpy as np
+
+
+def gatherRanges(order, starts, ends):
+    """
+    Concatenate order[starts[i]:ends[i]] for all i without a python loop
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=order.dtype)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return order[offsets + np.arange(total)]
+
+
+def sortedContains(sortedItems, items):
+    """
+    Boolean mask of *items* which are in the sorted array *sortedItems*
+    """
+    positions = np.searchsorted(sortedItems, items)
+    found = positions < len(sortedItems)
+    found[found] = sortedItems[positions[found]] == items[found]
+    return found
+
+
+def segmentsIntersectRect(x0, y0, x1, y1, rect):
+    """
+    Liang-Barsky clipping of the segments (x0, y0) -> (x1, y1) against *rect*,
+    returns a boolean mask of the segments which touch the rect
+    """
+    dx, dy = x1 - x0, y1 - y0
+    tMin = np.zeros(len(x0))
+    tMax = np.ones(len(x0))
+    inside = np.ones(len(x0), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in [
+            (-dx, x0 - rect.left()), (dx, rect.right() - x0),
+            (-dy, y0 - rect.top()), (dy, rect.bottom() - y0)
+        ]:
+            t = q / p
+            inside &= (p != 0) | (q >= 0)
+            tMin = np.where(p < 0, np.maximum(tMin, t), tMin)
+            tMax = np.where(p > 0, np.minimum(tMax, t), tMax)
+    return inside & (tMin <= tMax)
+
+
+class Grid:
+    """
+    Uniform grid over the bounding box of the vertices (absolute coordinates).
+
+    Items are bucketed by cell and stored sorted by cell id, so that a row of
+    cells is one contiguous slice. Items which have moved or been added after
+    the last rebuild are kept in a small set of loose items which is returned
+    by every query, until there are enough of them to justify a rebuild.
+    """
+    MAX_SIDE = 1024
+    MAX_LOOSE = 1024
+
+    def __init__(self):
+        self.x0 = self.y0 = 0.0
+        self.cellSize = 1.0
+        self.cols = self.rows = 1
+        self.order = np.empty(0, dtype=np.int64)
+        self.cellStart = np.zeros(2, dtype=np.int64)
+        self.stale = np.empty(0, dtype=bool)
+        self.loose = set()
+
+    def setBounds(self, xs, ys, side):
+        finiteXs = xs[np.isfinite(xs)]
+        finiteYs = ys[np.isfinite(ys)]
+        self.x0 = finiteXs.min() if len(finiteXs) else 0.0
+        self.y0 = finiteYs.min() if len(finiteYs) else 0.0
+        width = finiteXs.max() - self.x0 if len(finiteXs) else 0.0
+        height = finiteYs.max() - self.y0 if len(finiteYs) else 0.0
+
+        side = max(1, min(self.MAX_SIDE, side))
+        self.cellSize = max(width, height) / side or 1.0
+        self.cols = min(self.MAX_SIDE, int(width / self.cellSize) + 1)
+        self.rows = min(self.MAX_SIDE, int(height / self.cellSize) + 1)
+
+    def toCells(self, xs, ys):
+        cx = np.clip(np.nan_to_num((xs - self.x0) / self.cellSize), 0, self.cols - 1).astype(np.int64)
+        cy = np.clip(np.nan_to_num((ys - self.y0) / self.cellSize), 0, self.rows - 1).astype(np.int64)
+        return cx, cy
+
+    def fill(self, cellIds, items, itemCount):
+        sort = np.argsort(cellIds, kind='stable')
+        self.order = items[sort]
+        self.cellStart = np.zeros(self.cols * self.rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cellIds, minlength=self.cols * self.rows), out=self.cellStart[1:])
+        self.stale = np.zeros(itemCount, dtype=bool)
+        self.loose = set()
+
+    def markLoose(self, items):
+        """
+        Returns False if there are too many loose items and the grid should be rebuilt
+        """
+        items = [i for i in items if i not in self.loose]
+        self.loose.update(items)
+        items = [i for i in items if i < len(self.stale)]
+        self.stale[items] = True
+        return len(self.loose) <= self.MAX_LOOSE
+
+    def candidates(self, rect, margin=0):
+        """
+        Items in the cells overlapping *rect*, extended by *margin* cells, plus all loose items
+        """
+        (cx0, cx1), (cy0, cy1) = self.toCells(np.array([rect.left(), rect.right()]),
+                                              np.array([rect.top(), rect.bottom()]))
+        cx0, cy0 = max(cx0 - margin, 0), max(cy0 - margin, 0)
+        cx1, cy1 = min(cx1 + margin, self.cols - 1), min(cy1 + margin, self.rows - 1)
+        rowIds = np.arange(cy0, cy1 + 1) * self.cols
+        items = gatherRanges(self.order, self.cellStart[rowIds + cx0], self.cellStart[rowIds + cx1 + 1])
+        items = items[~self.stale[items]]
+        if self.loose:
+            items = np.concatenate([items, np.fromiter(self.loose, dtype=np.int64, count=len(self.loose))])
+        return items
+
+
+class SpatialIndex(Grid):
+    """
+    Grid over vertex positions, about one vertex per cell
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.xs = self.ys = np.empty(0)
+        self.cellIds = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def rebuild(self, xs, ys):
+        self.xs, self.ys = xs, ys
+        self.setBounds(xs, ys, int(sqrt(len(xs))))
+        cx, cy = self.toCells(xs, ys)
+        self.cellIds = cy * self.cols + cx
+        self.fill(self.cellIds, np.arange(len(xs)), len(xs))
+
+    def extend(self, xs, ys):
+        """
+        Vertices have been appended to the coordinate arrays
+        """
+        n = len(self.stale)
+        self.xs, self.ys = xs, ys
+        if not self.markLoose(range(n, len(xs))):
+            self.rebuild(xs, ys)
+
+    def move(self, index):
+        """
+        Coordinates of vertex *index* have been changed in place
+        """
+        if index in self.loose:
+            return
+        cx, cy = self.toCells(self.xs[index], self.ys[index])
+        if cy * self.cols + cx == self.cellIds[index]:
+            return
+        if not self.markLoose([index]):
+            self.rebuild(self.xs, self.ys)
+
+    def query(self, rect):
+        """
+        Sorted indices of all vertices inside *rect*
+        """
+        items = self.candidates(rect)
+        xs, ys = self.xs[items], self.ys[items]
+        inside = (xs >= rect.left()) & (xs <= rect.right()) & (ys >= rect.top()) & (ys <= rect.bottom())
+        return np.sort(items[inside])
+
+
+class EdgeIndex(Grid):
+    """
+    Grid of segment buckets: every edge is put in each cell its segment passes through.
+
+    The index is built lazily on the first query after the coordinates or the
+    edges changed, since it is only needed to pick edges.
+    """
+    MAX_SIDE = 256
+    MAX_ENTRIES = 4000000
+
+    def __init__(self):
+        super().__init__()
+        self.xs = self.ys = np.empty(0)
+        self.sources = self.targets = np.empty(0, dtype=np.int64)
+        self.dirty = False
+
+    def reset(self, xs, ys, sources, targets):
+        self.xs, self.ys = xs, ys
+        self.sources, self.targets = sources, targets
+        self.dirty = True
+
+    def move(self, edges):
+        """
+        Some ends of *edges* have been moved in place
+        """
+        if not self.dirty and not self.markLoose(edges.tolist()):
+            self.dirty = True
+
+    def rebuild(self):
+        self.dirty = False
+        x0, y0 = self.xs[self.sources], self.ys[self.sources]
+        x1, y1 = self.xs[self.targets], self.ys[self.targets]
+
+        # bound the number of (edge, cell) entries, long edges pass through a lot of cells
+        lengths = np.nan_to_num(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0)))
+        self.setBounds(self.xs, self.ys, 1)
+        side = min(sqrt(len(x0)), (self.MAX_ENTRIES - len(x0)) / max(lengths.sum() / self.cellSize, 1))
+        self.setBounds(self.xs, self.ys, int(side))
+
+        # sample each segment at least once per cell, the query looks one cell further to make up for corners
+        intervals = np.ceil(lengths / self.cellSize).astype(np.int64)
+        samples = intervals + 1
+        edges = np.repeat(np.arange(len(x0)), samples)
+        t = (np.arange(len(edges)) - np.repeat(np.cumsum(samples) - samples, samples)) / np.repeat(
+            np.maximum(intervals, 1), samples)
+        cx, cy = self.toCells(x0[edges] + (x1 - x0)[edges] * t, y0[edges] + (y1 - y0)[edges] * t)
+
+        entries = np.unique((cy * self.cols + cx) * len(x0) + edges)
+        self.fill(entries // max(len(x0), 1), entries % max(len(x0), 1), len(x0))
+
+    def query(self, rect):
+        """
+        Sorted indices of all edges whose segment touches *rect*
+        """
+        if self.dirty:
+            self.rebuild()
+        edges = np.unique(self.candidates(rect, margin=1))
+        s, t = self.sources[edges], self.targets[edges]
+        hit = segmentsIntersectRect(self.xs[s], self.ys[s], self.xs[t], self.ys[t], rect)
+        return edges[hit]
+
+
+class IncidenceIndex:
+    """
+    Edges sorted by source and by target, to find the edges incident to a set of vertices
+    """
+
+    def __init__(self):
+        self.sources = self.targets = np.empty(0, dtype=np.int64)
+        self.outOrder = self.inOrder = np.empty(0, dtype=np.int64)
+        self.outStart = self.inStart = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def rebuild(self, edgeList, vcount):
+        edgeList = np.array(edgeList, dtype=np.int64).reshape(-1, 2)
+        self.sources, self.targets = edgeList[:, 0], edgeList[:, 1]
+        self.outOrder = np.argsort(self.sources, kind='stable')
+        self.inOrder = np.argsort(self.targets, kind='stable')
+        self.outStart = np.zeros(vcount + 1, dtype=np.int64)
+        self.inStart = np.zeros(vcount + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sources, minlength=vcount), out=self.outStart[1:])
+        np.cumsum(np.bincount(self.targets, minlength=vcount), out=self.inStart[1:])
+
+    def degree(self, vertices):
+        return self.outStart[vertices + 1] - self.outStart[vertices] + self.inStart[vertices + 1] - self.inStart[vertices]
+
+    def incident(self, vertices):
+        """
+        Sorted, unique indices of the edges with at least one end in *vertices*
+        """
+        vertices = vertices[vertices < len(self.outStart) - 1]
+        out = gatherRanges(self.outOrder, self.outStart[vertices], self.outStart[vertices + 1])
+        inc = gatherRanges(self.inOrder, self.inStart[vertices], self.inStart[vertices + 1])
+        return np.union1d(out, inc)
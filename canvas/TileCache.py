@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from math import floor
+from time import perf_counter
+
+import numpy as np
+from PyQt5.QtCore import Qt, QPoint, QRect, QRectF, QTimer
+from PyQt5.QtGui import QPixmap, QPainter, QTransform, QImage
+
+from .EdgeRenderer import EdgeRenderer
+from .VertexRenderer import VertexRenderer
+from .utils import cosmeticPen
+
+
+def tileBytes(tile):
+    return tile.width() * tile.height() * tile.depth() // 8
+
+
+def segmentsCrossing(segments, left, top, right, bottom):
+    """
+    Mask of the (n, 4) *segments* which cross the rectangle: their bounding box
+    overlaps it, and its corners are not all on the same side of their line
+    """
+    x0, y0, x1, y1 = segments.T
+    mask = (np.maximum(x0, x1) >= left) & (np.minimum(x0, x1) <= right) & \
+        (np.maximum(y0, y1) >= top) & (np.minimum(y0, y1) <= bottom)
+    dx, dy = x1 - x0, y1 - y0
+    sides = [dx * (y - y0) - dy * (x - x0) for x, y in [(left, top), (right, top), (left, bottom), (right, bottom)]]
+    above = (sides[0] > 0) & (sides[1] > 0) & (sides[2] > 0) & (sides[3] > 0)
+    below = (sides[0] < 0) & (sides[1] < 0) & (sides[2] < 0) & (sides[3] < 0)
+    return mask & ~above & ~below
+
+
+class StaticScene:
+    """
+    Static layers of the canvas culled to a region, so that rasterizing a few
+    tiles only draws the edges & vertices around them rather than everything
+    in the cached region. It holds the buffers of the last buildRenderers,
+    which are replaced rather than modified
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.radius = canvas.POINT_RADIUS / canvas.zoom
+        self.pointSize = canvas.LOD_POINT_SIZE
+        # anything drawn for a vertex or an arrowhead is within this distance of its position
+        self.margin = (canvas.POINT_RADIUS + canvas.ARROW_SIZE + canvas.LOD_POINT_SIZE) / canvas.zoom
+        self.drawArrowheads, self.drawPoints = canvas.drawArrowheads, canvas.drawPoints
+
+        renderer = canvas.edgeRenderer
+        self.density = renderer.density
+        self.densityRect = renderer.densityRect if renderer.density is not None else None
+        # edges are culled segment by segment: a long shaft is only drawn where it crosses the region,
+        # the outline of an arrowhead only around its tip
+        lines = canvas.staticLines if self.drawArrowheads else canvas.staticLines[:, :1]
+        self.segments = lines.reshape(-1, 4)
+        self.segmentEdges = np.repeat(np.arange(len(lines)), lines.shape[1])
+        self.heads = canvas.staticHeads if self.drawArrowheads else np.empty((0, 3, 2))
+        self.edgeColors = canvas.staticEdgeColors
+        self.xs, self.ys, self.vertexColors = canvas.staticXs, canvas.staticYs, canvas.staticVertexColors
+
+    def paint(self, painter, rect):
+        """
+        Edges & vertices which may show in *rect*, in absolute coordinates like *painter*
+        """
+        left, top = rect.left() - self.margin, rect.top() - self.margin
+        right, bottom = rect.right() + self.margin, rect.bottom() + self.margin
+
+        canvas = self.canvas
+        canvas.dispatch('beforePaintEdges', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        if self.density is not None:
+            painter.drawImage(self.densityRect, self.density)
+        else:
+            segments = np.flatnonzero(segmentsCrossing(self.segments, left, top, right, bottom))
+            tips = self.heads[:, 0]
+            heads = np.flatnonzero(
+                (tips[:, 0] >= left) & (tips[:, 0] <= right) & (tips[:, 1] >= top) & (tips[:, 1] <= bottom)
+            )
+            renderer = EdgeRenderer()
+            renderer.build(
+                self.segments[segments, np.newaxis], self.heads[heads],
+                [self.edgeColors[i] for i in self.segmentEdges[segments]]
+            )
+            renderer.paint(painter)
+
+        vertices = np.flatnonzero((self.xs >= left) & (self.xs <= right) & (self.ys >= top) & (self.ys <= bottom))
+        renderer = VertexRenderer()
+        renderer.build(
+            self.xs[vertices], self.ys[vertices], [self.vertexColors[i] for i in vertices], points=self.drawPoints
+        )
+        canvas.dispatch('beforePaintVertices', painter)
+        painter.setPen(cosmeticPen(painter.pen()))
+        renderer.paint(painter, self.radius, self.pointSize)
+
+
+class ProgressiveRender:
+    """
+    Rasterization of the bounding box of some missing tiles spread over
+    several frames. Vertices are drawn first, highest degree first, then the
+    edges. Each is drawn on its own layer so that edges still end up below
+    the vertices
+    """
+
+    def __init__(self, cache, keys):
+        size = cache.TILE_SIZE
+        self.keys = set(keys)
+        self.col0, self.row0 = min(col for col, _ in keys), min(row for _, row in keys)
+        self.col1, self.row1 = max(col for col, _ in keys), max(row for _, row in keys)
+        width, height = (self.col1 - self.col0 + 1) * size, (self.row1 - self.row0 + 1) * size
+        self.edges = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        self.edges.fill(Qt.transparent)
+        self.vertices = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        self.vertices.fill(Qt.transparent)
+        self.transform = QTransform(cache.zoom, 0, 0, cache.zoom, -self.col0 * size, -self.row0 * size)
+        self.steps = self.paintLayers(cache.canvas)
+
+    def paintLayers(self, canvas):
+        painter = QPainter(self.vertices)
+        painter.setTransform(self.transform)
+        try:
+            yield from canvas.paintVertexLayer(painter, byDegree=True)
+        finally:
+            painter.end()
+
+        painter = QPainter(self.edges)
+        painter.setTransform(self.transform)
+        try:
+            yield from canvas.paintEdgeLayer(painter)
+        finally:
+            painter.end()
+
+    def run(self, deadline):
+        """
+        Draw until *deadline* (perf_counter), returns True once everything is drawn
+        """
+        for _ in self.steps:
+            if perf_counter() >= deadline:
+                return False
+        return True
+
+    def cancel(self):
+        self.steps.close()
+
+    def paint(self, painter, origin, size):
+        """
+        Draw what is done so far of the missing tiles, *origin* being the position of tile (0, 0)
+        """
+        for col, row in self.keys:
+            source = QRect((col - self.col0) * size, (row - self.row0) * size, size, size)
+            point = origin + QPoint(col * size, row * size)
+            painter.drawImage(point, self.edges, source)
+            painter.drawImage(point, self.vertices, source)
+
+    def image(self):
+        painter = QPainter(self.edges)
+        painter.drawImage(0, 0, self.vertices)
+        painter.end()
+        return self.edges
+
+
+class TileCache:
+    """
+    Off-screen cache of the static layers of the canvas (edges & unselected
+    vertices), as pixmap tiles of TILE_SIZE pixels aligned on the world at the
+    current zoom. Painting blits the tiles in view and only rasterizes the ones
+    which are missing, the least recently used tiles are evicted past *budget* bytes.
+
+    Missing tiles only draw the static scene culled to their bounding box, which
+    is built once per clear.
+
+    With a *frameBudget* (seconds), missing tiles are rasterized progressively:
+    each paint draws for at most that long, shows what is done so far and
+    schedules another paint. The render restarts if the missing tiles change
+    """
+    TILE_SIZE = 256
+
+    def __init__(self, canvas, budget=64 * 1024 * 1024):
+        self.canvas = canvas
+        self.budget = budget
+        self.tiles = OrderedDict()
+        self.zoom = None
+        self.size = 0
+        self.frameBudget = None
+        self.progress = None
+        self.scene = None
+
+    def clear(self):
+        self.tiles.clear()
+        self.size = 0
+        self.scene = None
+        if self.progress is not None:
+            self.progress.cancel()
+            self.progress = None
+
+    def paint(self, painter, complete=False):
+        """
+        *complete*: rasterize missing tiles right away, even when rendering progressively
+        """
+        canvas = self.canvas
+        if canvas.zoom != self.zoom:
+            self.clear()
+            self.zoom = canvas.zoom
+
+        # top left of the view in pixels of the world at this zoom, rounded so that tiles land on whole pixels
+        left = round(canvas.viewRect.x() * self.zoom)
+        top = round(canvas.viewRect.y() * self.zoom)
+        cols = range(floor(left / self.TILE_SIZE), floor((left + canvas.WIDTH) / self.TILE_SIZE) + 1)
+        rows = range(floor(top / self.TILE_SIZE), floor((top + canvas.HEIGHT) / self.TILE_SIZE) + 1)
+        visible = [(col, row) for row in rows for col in cols]
+
+        missing = [key for key in visible if key not in self.tiles]
+        if missing and self.frameBudget is not None and not complete:
+            with canvas.profiler.section('renderTiles'):
+                self.renderProgressively(painter, missing, QPoint(-left, -top))
+        elif missing:
+            with canvas.profiler.section('renderTiles'):
+                self.render(missing)
+
+        for key in visible:
+            tile = self.tiles.get(key)
+            if tile is None:
+                continue
+            self.tiles.move_to_end(key)
+            point = QPoint(key[0] * self.TILE_SIZE - left, key[1] * self.TILE_SIZE - top)
+            painter.drawPixmap(point, tile)
+        self.evict(set(visible))
+
+    def renderProgressively(self, painter, keys, origin):
+        if self.progress is not None and self.progress.keys != set(keys):
+            self.progress.cancel()
+            self.progress = None
+        if self.progress is None:
+            self.progress = ProgressiveRender(self, keys)
+
+        progress = self.progress
+        if not progress.run(perf_counter() + self.frameBudget):
+            progress.paint(painter, origin, self.TILE_SIZE)
+            QTimer.singleShot(0, self.canvas.update)
+            return
+
+        self.progress = None
+        self.split(progress.image(), progress.col0, progress.row0, keys)
+
+    def render(self, keys):
+        """
+        Rasterize the tiles *keys* in a single pass over their bounding box
+        """
+        col0, row0 = min(col for col, _ in keys), min(row for _, row in keys)
+        col1, row1 = max(col for col, _ in keys), max(row for _, row in keys)
+        image = QPixmap((col1 - col0 + 1) * self.TILE_SIZE, (row1 - row0 + 1) * self.TILE_SIZE)
+        image.fill(Qt.transparent)
+
+        painter = QPainter(image)
+        painter.setTransform(QTransform(
+            self.zoom, 0, 0, self.zoom, -col0 * self.TILE_SIZE, -row0 * self.TILE_SIZE
+        ))
+        if self.scene is None:
+            self.scene = StaticScene(self.canvas)
+        size = self.TILE_SIZE / self.zoom
+        self.scene.paint(painter, QRectF(col0 * size, row0 * size, (col1 - col0 + 1) * size, (row1 - row0 + 1) * size))
+        painter.end()
+        self.split(image, col0, row0, keys)
+
+    def split(self, image, col0, row0, keys):
+        """
+        Cut the tiles *keys* out of *image*, whose top left is tile (col0, row0)
+        """
+        for col, row in keys:
+            tile = image.copy(QRect(
+                (col - col0) * self.TILE_SIZE, (row - row0) * self.TILE_SIZE, self.TILE_SIZE, self.TILE_SIZE
+            ))
+            self.tiles[(col, row)] = tile
+            self.size += tileBytes(tile)
+
+    def evict(self, keep):
+        for key in list(self.tiles):
+            if self.size <= self.budget:
+                break
+            if key not in keep:
+                self.size -= tileBytes(self.tiles.pop(key))
@@ -4,6 +4,7 @@ from PyQt5.QtCore import pyqtSignal, QObject
 from igraph._igraph import InternalError
 from numpy import argsort, mean
 
+from .DetailLoader import detailInfo
 from .Mode import Mode
 
 
@@ -62,10 +63,6 @@ class UpdateInfoMode(Mode, QObject):
                 'pageID': str(vertex['pageid']),
                 'pageInLinkCount': str(vertex.indegree()),
                 'pageOutLinkCount': str(vertex.outdegree()),
-                'pageRefCount': str(vertex['refCount']),
-                'pageImgCount': str(vertex['imgCount']),
-                'pageWordCount': str(vertex['wordCount']),
-                'pageCatCount': str(vertex['catCount']),
-                'pageSummary': vertex['summary'],
+                **detailInfo(self.canvas.detailLoader.details(vertex))
             })
         self.updateSummarySignal.emit(info)
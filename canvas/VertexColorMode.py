@@ -70,6 +70,7 @@ class VertexColorMode(Mode):
             centrality = getattr(self.canvas.g, self.method)()
             g.vs['color'] = arrayToSpectrum(centrality, self.relative)
             g.vs['cluster'] = [color.name() for color in g.vs['color']]
+        self.canvas.invalidate(self.canvas.DIRTY_COLORS)
 
     def setColorMethod(self, method, clusterAlgo, relative):
         self.method = method
@@ -0,0 +1,55 @@
+import numpy as np
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QPen
+
+from .utils import groupByColor, cosmeticPen
+
+
+class VertexRenderer:
+    """
+    Draws the vertices of the frame. In full detail every vertex is a circle,
+    drawn in index order. In reduced detail all vertices of a color are drawn
+    as points with a single drawPoints call
+    """
+
+    BATCH_SIZE = 1024
+
+    def __init__(self):
+        self.xs = self.ys = np.empty(0)
+        self.colors = []
+        self.groups = None
+
+    def build(self, xs, ys, colors, points=False):
+        self.xs, self.ys, self.colors = xs, ys, colors
+        self.groups = groupByColor(colors, np.column_stack([xs, ys])) if points else None
+
+    def paint(self, painter, radius, pointSize):
+        """
+        *radius* is in the painter's coordinates, *pointSize* in pixels
+        """
+        for _ in self.paintBatches(painter, radius, pointSize):
+            pass
+
+    def paintBatches(self, painter, radius, pointSize, order=None):
+        """
+        Generator drawing one batch per step. Circles are drawn in *order*
+        (positions in the built arrays) if given, points by color
+        """
+        if self.groups is not None:
+            for color, points in self.groups:
+                painter.setPen(cosmeticPen(QPen(color, pointSize)))
+                painter.drawPoints(points)
+                yield
+            return
+
+        if order is None:
+            order = np.arange(len(self.xs))
+        xs = (self.xs[order] - radius / 2.0).tolist()
+        ys = (self.ys[order] - radius / 2.0).tolist()
+        colors = [self.colors[i] for i in order]
+        for start in range(0, len(order), self.BATCH_SIZE):
+            end = start + self.BATCH_SIZE
+            for x, y, color in zip(xs[start:end], ys[start:end], colors[start:end]):
+                painter.setBrush(color)
+                painter.drawEllipse(QRectF(x, y, radius, radius))
+            yield
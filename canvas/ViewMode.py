@@ -29,6 +29,7 @@ class ViewMode(Mode, ABC):
         vs = self.canvas.g.vs
         print(len(vs.select(visited=True)))
         vs['color'] = [self.visitedPageColor if v['visited'] else self.unvisitedPageColor for v in vs]
+        self.canvas.invalidate(self.canvas.DIRTY_COLORS)
 
     def onSet(self):
         g = self.canvas.g
@@ -36,6 +37,7 @@ class ViewMode(Mode, ABC):
             g.es['color'] = [self.lineColor] * g.ecount()
             if len(set([c.name() for c in g.vs['color']])) <= 2:
                 self.setVerticesColor()
+            self.canvas.invalidate(self.canvas.DIRTY_COLORS)
 
     def onSetGraph(self):
         g = self.canvas.g
@@ -52,6 +54,7 @@ class ViewMode(Mode, ABC):
                     self.setVerticesColor()
         else:
             g.vs['color'] = self.visitedPageColor
+        self.canvas.invalidate(self.canvas.DIRTY_COLORS)
 
     def onNewVerticesAdded(self):
         self.canvas.g.es['color'] = self.lineColor
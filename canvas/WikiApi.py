@@ -0,0 +1,175 @@
+from threading import local, Lock
+from time import perf_counter, sleep
+
+import requests
+
+USER_AGENT = 'WikipediaGraphViz (https://github.com/dthung1602/WikipediaGraphViz)'
+
+
+class WikiApiError(Exception):
+    pass
+
+
+class WikiPage:
+    """
+    Page fetched by WikiApi, with the attributes of wikipedia.WikipediaPage used by the crawler
+    """
+
+    def __init__(self, title, pageid):
+        self.title = title
+        self.pageid = str(pageid)
+        self.links = []
+        self.categories = []
+        self.summary = ''
+        self.references = []
+        self.images = []
+
+    @staticmethod
+    def fromDict(data):
+        """
+        Inverse of vars(page)
+        """
+        page = WikiPage(data['title'], data['pageid'])
+        vars(page).update(data)
+        return page
+
+
+class WikiApi:
+    """
+    Client of the MediaWiki query API fetching up to BATCH_SIZE pages per request.
+    Continuations are followed until every property of every page is complete.
+    Can be shared by threads, each has its own HTTP session.
+
+    Requests go through *limiter* (a RateLimiter) if given, and throttled ones
+    are retried up to MAX_RETRIES times, not before their Retry-After delay
+    """
+    BATCH_SIZE = 50
+    TIMEOUT = 30
+    MAX_RETRIES = 3
+    THROTTLED_STATUS = {429, 503}
+    THROTTLED_ERRORS = {'maxlag', 'ratelimited'}
+
+    def __init__(self, language='en', apiUrl=None, limiter=None):
+        self.apiUrl = apiUrl or 'https://%s.wikipedia.org/w/api.php' % language
+        self.limiter = limiter
+        self.local = local()
+        self.lock = Lock()
+        self.requestCount = 0
+
+    @property
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    @staticmethod
+    def retryAfter(response):
+        """
+        Seconds to wait given by the Retry-After header of *response*, None if it has none in seconds
+        """
+        try:
+            return max(0, float(response.headers['Retry-After']))
+        except (KeyError, ValueError):
+            return None
+
+    def query(self, params):
+        params = dict(params, action='query', format='json', formatversion=2)
+        for attempt in range(self.MAX_RETRIES + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            startTime = perf_counter()
+            try:
+                response = self.session.get(self.apiUrl, params=params, timeout=self.TIMEOUT)
+                with self.lock:
+                    self.requestCount += 1
+                throttled = response.status_code in self.THROTTLED_STATUS
+                if not throttled:
+                    response.raise_for_status()
+                    data = response.json()
+                    throttled = data.get('error', {}).get('code') in self.THROTTLED_ERRORS
+            except (requests.RequestException, ValueError) as e:
+                raise WikiApiError(str(e)) from e
+
+            retryAfter = self.retryAfter(response) if throttled else None
+            if self.limiter is not None:
+                self.limiter.onResponse(perf_counter() - startTime, throttled, retryAfter)
+            if not throttled:
+                break
+            print('Throttled by %s, retrying' % self.apiUrl)
+            if self.limiter is None:
+                sleep(max(retryAfter or 0, 2 ** attempt))
+        else:
+            raise WikiApiError('Throttled by %s' % self.apiUrl)
+
+        if 'error' in data:
+            raise WikiApiError('%s: %s' % (data['error'].get('code'), data['error'].get('info')))
+        return data
+
+    def random(self):
+        data = self.query({'list': 'random', 'rnnamespace': 0, 'rnlimit': 1})
+        return data['query']['random'][0]['title']
+
+    def fetchPages(self, titles, loadDetails=True):
+        """
+        Dict from each of *titles* (at most BATCH_SIZE) to its WikiPage, following
+        redirects. Titles of missing pages are left out
+        """
+        props = ['info', 'links', 'categories']
+        params = {
+            'titles': '|'.join(titles),
+            'redirects': 1,
+            'pllimit': 'max', 'plnamespace': 0,
+            'cllimit': 'max',
+        }
+        if loadDetails:
+            props += ['extracts', 'images', 'extlinks']
+            params.update({
+                'exintro': 1, 'explaintext': 1, 'exlimit': 'max',
+                'imlimit': 'max',
+                'ellimit': 'max',
+            })
+        params['prop'] = '|'.join(props)
+
+        pages = {}
+        renamed = {}
+        while True:
+            data = self.query(params)
+            query = data.get('query', {})
+            for rename in query.get('normalized', []) + query.get('redirects', []):
+                renamed[rename['from']] = rename['to']
+            for item in query.get('pages', []):
+                if item.get('missing') or item.get('invalid'):
+                    continue
+                page = pages.get(item['title'])
+                if page is None:
+                    page = pages[item['title']] = WikiPage(item['title'], item['pageid'])
+                self.mergePage(page, item)
+            if 'continue' not in data:
+                break
+            params.update(data['continue'])
+
+        found = {}
+        for title in titles:
+            # a title can be normalized, then redirected
+            resolved, seen = title, set()
+            while resolved in renamed and resolved not in seen:
+                seen.add(resolved)
+                resolved = renamed[resolved]
+            if resolved in pages:
+                found[title] = pages[resolved]
+        return found
+
+    @staticmethod
+    def mergePage(page, item):
+        """
+        Add the properties of the API result *item*, which may be part of a continuation, to *page*
+        """
+        page.links += [link['title'] for link in item.get('links', [])]
+        # like the wikipedia package, categories are given without their namespace prefix
+        page.categories += [category['title'].split(':', 1)[-1] for category in item.get('categories', [])]
+        page.images += [image['title'] for image in item.get('images', [])]
+        page.references += [link['url'] for link in item.get('extlinks', [])]
+        if item.get('extract'):
+            page.summary = item['extract']
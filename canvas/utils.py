@@ -1,6 +1,7 @@
 from math import sin, pi
 from random import choice
 
+import numpy as np
 from PyQt5.QtGui import *
 
 
@@ -39,3 +40,43 @@ def arrayToSpectrum(arr, relative):
             return [QColor(255, 0, 0)] * len(arr)
         step = (maxValue - minValue) / 100.0
         return [QColor(rgbs[100 - int((value - minValue) / step)]) for value in arr]
+
+
+def toPolygonF(points):
+    """
+    Copy a (n, 2) array of coordinates into a QPolygonF without creating a QPointF per point
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = QPolygonF(len(points))
+    if len(points) > 0:
+        buffer = polygon.data()
+        buffer.setsize(points.nbytes)
+        np.frombuffer(buffer, dtype=np.float64).reshape(-1, 2)[:] = points
+    return polygon
+
+
+def groupByColor(colors, points, batchSize=None):
+    """
+    Split the (n, ...) array *points* by the n *colors*, as a list of (QColor, QPolygonF).
+    With *batchSize*, groups are further split in consecutive batches of at most *batchSize* items
+    """
+    if len(colors) == 0:
+        return []
+    keys = np.array([c.rgba() for c in colors], dtype=np.uint32)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    ends = np.cumsum(np.bincount(inverse))
+    return [
+        (colors[first[group]], toPolygonF(points[order[batchStart:min(batchStart + (batchSize or end), end)]]))
+        for group, (start, end) in enumerate(zip(ends - np.bincount(inverse), ends))
+        for batchStart in range(start, end, batchSize or end)
+    ]
+
+
+def cosmeticPen(pen):
+    """
+    Copy of *pen* whose width is in pixels, whatever the painter's transform
+    """
+    pen = QPen(pen)
+    pen.setCosmetic(True)
+    return pen
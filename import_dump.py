@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Builds the graph of a Wikipedia from its database dumps instead of crawling it,
+and saves it as GraphML, to be opened with File > Open.
+
+    python3 import_dump.py --page enwiki-latest-page.sql.gz \\
+        --pagelinks enwiki-latest-pagelinks.sql.gz --linktarget enwiki-latest-linktarget.sql.gz \\
+        --start 'Graph theory' --hops 2 --output graph-theory.graphml
+
+Dumps are at https://dumps.wikimedia.org, see canvas/DumpImporter.py for the
+accepted formats. Without --start, every article is imported.
+"""
+
+import argparse
+import sys
+from time import perf_counter
+
+from canvas.DumpImporter import DumpImporter, DumpImportError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the graph of a Wikipedia from its database dumps')
+    parser.add_argument('--page', required=True, help='page table, .sql[.gz] or .tsv[.gz]')
+    parser.add_argument('--pagelinks', required=True, help='pagelinks table, .sql[.gz] or .tsv[.gz]')
+    parser.add_argument('--linktarget', help='linktarget table, for dumps where pagelinks has pl_target_id')
+    parser.add_argument('--start', help='only import the articles around this one')
+    parser.add_argument('--hops', type=int, default=2, help='maximum number of links from --start')
+    parser.add_argument('--output', required=True, help='GraphML file to write')
+    args = parser.parse_args()
+
+    startTime = perf_counter()
+    importer = DumpImporter(args.page, args.pagelinks, args.linktarget)
+    try:
+        g = importer.build(args.start, args.hops)
+    except DumpImportError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    g.write_graphml(args.output)
+    print('%d vertices, %d edges in %.1fs' % (g.vcount(), g.ecount(), perf_counter() - startTime), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
-import wikipedia
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import *
 from PyQt5.uic import loadUi
 
+from canvas.WikiApi import WikiApi, WikiApiError
 from .Switch import Switch
 
 AVAILABLE_WIKI_LANG = [  # 15 wiki with > 1000000 pages
@@ -36,10 +36,13 @@ class CrawlDialog(QMainWindow):
         self.languageComboBox = self.findChild(QComboBox, 'languageComboBox')
         self.languageComboBox.addItems([lang[0] for lang in AVAILABLE_WIKI_LANG])
 
-        self.delay = self.findChild(QLineEdit, 'delay')
+        self.rate = self.findChild(QLineEdit, 'rate')
+        self.burst = self.findChild(QLineEdit, 'burst')
+        self.concurrency = self.findChild(QLineEdit, 'concurrency')
         self.startPage = self.findChild(QLineEdit, 'startPage')
         self.loadDetails = Switch(parent=self.findChild(QLabel, 'switchContainer'))
         self.loadDetails.setChecked(True)
+        self.lazyDetailsCheckBox = self.findChild(QCheckBox, 'lazyDetailsCheckBox')
 
         for lineEditName in ['reachPage', 'maxPage', 'maxDepth', 'timeLimit']:
             setattr(self, lineEditName, self.findChild(QLineEdit, lineEditName))
@@ -54,6 +57,8 @@ class CrawlDialog(QMainWindow):
         self.bfsRadio.clicked.connect(self.handleRadioChange('bfsRadio'))
         self.randomRadio = self.findChild(QRadioButton, 'randomRadio')
         self.randomRadio.clicked.connect(self.handleRadioChange('randomRadio'))
+        self.priorityRadio = self.findChild(QRadioButton, 'priorityRadio')
+        self.priorityRadio.clicked.connect(self.handleRadioChange('priorityRadio'))
 
         self.findChild(QPushButton, 'randomBtn').pressed.connect(self.handleRandomStartPage)
 
@@ -84,14 +89,19 @@ class CrawlDialog(QMainWindow):
             self.enableEdit(False)
 
         self.languageComboBox.setCurrentIndex([opt[1] for opt in AVAILABLE_WIKI_LANG].index(crawlMode.language))
-        self.delay.setText(str(crawlMode.delay))
+        self.rate.setText(str(crawlMode.rate))
+        self.burst.setText(str(crawlMode.burst))
+        self.concurrency.setText(str(crawlMode.concurrency))
         if crawlMode.searchAlgo == 'BFS':
             self.bfsRadio.setChecked(True)
         elif crawlMode.searchAlgo == 'DFS':
             self.dfsRadio.setChecked(True)
+        elif crawlMode.searchAlgo == 'PRIORITY':
+            self.priorityRadio.setChecked(True)
         else:
             self.randomRadio.setChecked(True)
         self.loadDetails.setChecked(crawlMode.loadDetails)
+        self.lazyDetailsCheckBox.setChecked(crawlMode.lazyDetails)
         self.startPage.setText(crawlMode.startPage)
         for lineEditName in ['reachPage', 'maxPage', 'maxDepth', 'timeLimit']:
             value = getattr(crawlMode, lineEditName)
@@ -105,6 +115,7 @@ class CrawlDialog(QMainWindow):
             self.dfsRadio.setChecked(False)
             self.bfsRadio.setChecked(False)
             self.randomRadio.setChecked(False)
+            self.priorityRadio.setChecked(False)
             getattr(self, radioName).setChecked(True)
 
         return func
@@ -124,7 +135,11 @@ class CrawlDialog(QMainWindow):
             getattr(self, attr).setDisabled(value)
 
     def handleRandomStartPage(self):
-        self.startPage.setText(wikipedia.random())
+        try:
+            language = AVAILABLE_WIKI_LANG[self.languageComboBox.currentIndex()][1]
+            self.startPage.setText(WikiApi(language).random())
+        except WikiApiError as e:
+            print(e)
 
     def handlePause(self, *args):
         self.pauseResumeBtn.setText('Resume')
@@ -149,6 +164,15 @@ class CrawlDialog(QMainWindow):
         else:
             self.crawlMode.resume()
 
+    def searchAlgo(self):
+        if self.dfsRadio.isChecked():
+            return 'DFS'
+        if self.bfsRadio.isChecked():
+            return 'BFS'
+        if self.priorityRadio.isChecked():
+            return 'PRIORITY'
+        return 'RAND'
+
     def floatOrDefault(self, attrName, defaultValue=None):
         value = getattr(self, attrName).text()
         try:
@@ -168,10 +192,13 @@ class CrawlDialog(QMainWindow):
         if self.crawlMode.status in ['stopped', 'done']:
             settings = {
                 'language': AVAILABLE_WIKI_LANG[self.languageComboBox.currentIndex()][1],
-                'searchAlgo': 'DFS' if self.dfsRadio.isChecked() else 'BFS' if self.bfsRadio.isChecked() else 'RAND',
-                'delay': self.floatOrDefault('delay', 1),
+                'searchAlgo': self.searchAlgo(),
+                'rate': self.floatOrDefault('rate', 2),
+                'burst': self.floatOrDefault('burst', 4),
+                'concurrency': self.floatOrDefault('concurrency', 4),
                 'startPage': self.strOrDefault('startPage', 'Graph theory'),
-                'loadDetails': self.loadDetails.isChecked()
+                'loadDetails': self.loadDetails.isChecked(),
+                'lazyDetails': self.lazyDetailsCheckBox.isChecked()
             }
 
             if self.reachPageCheckBox.isChecked():
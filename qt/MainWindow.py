@@ -64,6 +64,7 @@ class MainWindow(QMainWindow):
         self.canvas.setGraph(DEFAULT_GRAPH)
 
         self.resumeAction = self.pauseAction = self.stopAction = self.startAction = None
+        self.resumeCheckpointAction = None
         self.statDialog = self.crawlSettingDialog = self.searchDialog = None
         self.status = self.timeElapsed = None
         self.liveUpdateSwitch = self.showUnvisitedSwitch = None
@@ -98,6 +99,9 @@ class MainWindow(QMainWindow):
         self.findChild(QAction, 'actionZoomIn').triggered.connect(self.handleZoomIn)
         self.findChild(QAction, 'actionZoomOut').triggered.connect(self.handleZoomOut)
         self.findChild(QAction, 'actionResetZoom').triggered.connect(self.handleResetZoom)
+        self.findChild(QAction, 'actionProgressiveRendering').toggled.connect(self.canvas.setProgressiveRendering)
+        self.findChild(QAction, 'actionProfiler').toggled.connect(self.canvas.setProfiling)
+        self.findChild(QAction, 'actionDumpProfile').triggered.connect(lambda *args: self.canvas.profiler.dump())
         self.findChild(QAction, 'actionLightMode').triggered.connect(self.changeViewModeTo(LightViewMode))
         self.findChild(QAction, 'actionGrayMode').triggered.connect(self.changeViewModeTo(GrayViewMode))
         self.findChild(QAction, 'actionDarkMode').triggered.connect(self.changeViewModeTo(DarkViewMode))
@@ -110,6 +114,8 @@ class MainWindow(QMainWindow):
         self.pauseAction.triggered.connect(lambda: self.crawlMode.pause())
         self.resumeAction = self.findChild(QAction, 'actionResumeCrawling')
         self.resumeAction.triggered.connect(lambda: self.crawlMode.resume())
+        self.resumeCheckpointAction = self.findChild(QAction, 'actionResumeFromCheckpoint')
+        self.resumeCheckpointAction.triggered.connect(self.handleResumeFromCheckpoint)
         self.findChild(QAction, 'actionCrawlSetting').triggered.connect(self.handleCrawlSetting)
         # Tools
         self.findChild(QAction, 'actionFindShortestPath').triggered.connect(self.handleFindShortestPath)
@@ -234,7 +240,7 @@ class MainWindow(QMainWindow):
         if fileName != '':
             img = QPixmap(self.canvas.size())
             painter = QPainter(img)
-            self.canvas.paint(painter)
+            self.canvas.paint(painter, complete=True)
             painter.end()
             img.save(fileName)
 
@@ -274,6 +280,7 @@ class MainWindow(QMainWindow):
         self.resumeAction.setEnabled(False)
         self.startBtn.setVisible(False)
         self.startAction.setEnabled(False)
+        self.resumeCheckpointAction.setEnabled(False)
         self.stopBtn.setVisible(True)
         self.stopAction.setEnabled(True)
 
@@ -284,9 +291,23 @@ class MainWindow(QMainWindow):
         self.resumeAction.setEnabled(False)
         self.startBtn.setVisible(True)
         self.startAction.setEnabled(True)
+        self.resumeCheckpointAction.setEnabled(True)
         self.stopBtn.setVisible(False)
         self.stopAction.setEnabled(False)
 
+    def handleResumeFromCheckpoint(self):
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        fileName, _ = QFileDialog.getOpenFileName(
+            self, "Resume from checkpoint", "./cache",
+            "Crawl Checkpoints (*.checkpoint)", options=options
+        )
+        if fileName:
+            try:
+                self.crawlMode.resumeCrawl(fileName)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                QMessageBox.warning(self, "Resume from checkpoint", "%s is not a crawl checkpoint: %s" % (fileName, e))
+
     def handleCrawlSetting(self):
         self.crawlSettingDialog = CrawlDialog(self.crawlMode)
         self.crawlSettingDialog.show()
@@ -352,7 +373,7 @@ class MainWindow(QMainWindow):
 
     def handleShowUnvisitedChange(self, value):
         self.canvas.showUnvisited = value
-        self.canvas.update()
+        self.canvas.invalidate(Canvas.DIRTY_VISIBILITY)
 
     def handleLiveUpdateChange(self, value):
         self.canvas.liveUpdate = value
@@ -400,5 +421,5 @@ class MainWindow(QMainWindow):
             self.crawlSettingDialog.notifyCrawlDone()
 
     def updateStatus(self):
-        self.status.setText(self.crawlMode.status)
+        self.status.setText(self.crawlMode.statusText())
         self.timeElapsed.setText(self.crawlMode.timeElapsedText())
@@ -0,0 +1,66 @@
+"""
+CrawlCheckpoint logs over temporary files.
+
+    python -m pytest tests
+"""
+
+import json
+
+import pytest
+
+from canvas.CrawlCheckpoint import CrawlCheckpoint
+from canvas.WikiApi import WikiPage
+
+SETTINGS = {'searchAlgo': 'BFS', 'startPage': 'Graph theory'}
+
+
+def writeLog(path):
+    checkpoint = CrawlCheckpoint(str(path))
+    checkpoint.begin(SETTINGS)
+    checkpoint.addBatch([(0, WikiPage('Graph theory', 1))], [], 1.5)
+    checkpoint.addBatch([(1, WikiPage('Vertex', 2))], [2], 3.0)
+    checkpoint.close()
+
+
+def test_batchesAreReadBack(tmp_path):
+    writeLog(tmp_path / 'crawl.checkpoint')
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'crawl.checkpoint'))
+
+    assert checkpoint.settings() == SETTINGS
+    batches = list(checkpoint.batches())
+    assert [[vertex for vertex, _ in batch['pages']] for batch in batches] == [[0], [1]]
+    assert WikiPage.fromDict(batches[1]['pages'][0][1]).title == 'Vertex'
+    assert [batch['missing'] for batch in batches] == [[], [2]]
+    assert batches[-1]['timeElapsed'] == 3.0
+
+
+@pytest.mark.parametrize('tail', [
+    '{"pages": [[2, {"title": "Ed',  # cut by a crash
+    '{"pages": [], "missing": []}\n',  # no timeElapsed
+    '[1, 2]\n',
+    'not json\n',
+])
+def test_reopenTruncatesAfterTheLastCompleteBatch(tmp_path, tail):
+    path = tmp_path / 'crawl.checkpoint'
+    writeLog(path)
+    complete = path.read_bytes()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(tail)
+
+    checkpoint = CrawlCheckpoint(str(path))
+    assert len(list(checkpoint.batches())) == 2
+    checkpoint.reopen()
+    checkpoint.addBatch([], [3], 4.0)
+    checkpoint.close()
+
+    assert path.read_bytes().startswith(complete)
+    assert [batch['missing'] for batch in CrawlCheckpoint(str(path)).batches()] == [[], [2], [3]]
+
+
+@pytest.mark.parametrize('content', ['', 'not json\n', '[1, 2]\n', json.dumps({'pages': []}) + '\n'])
+def test_otherFilesAreRejected(tmp_path, content):
+    path = tmp_path / 'other.checkpoint'
+    path.write_text(content, encoding='utf-8')
+
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        CrawlCheckpoint(str(path)).settings()
@@ -0,0 +1,247 @@
+"""
+WikiApi & CrawlMode against a local mock of the MediaWiki query API.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from urllib.parse import urlparse, parse_qs
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+from canvas import Canvas, CrawlMode, DarkViewMode
+from canvas.CrawlCheckpoint import CrawlCheckpoint
+from canvas.RateLimiter import RateLimiter
+from canvas.WikiApi import WikiApi, WikiApiError
+
+PAGES = {
+    'Graph theory': ['Vertex', 'Edge', 'Leonhard Euler'],
+    'Vertex': ['Graph theory', 'Edge'],
+    'Edge': ['Vertex', 'Missing page'],
+    'Leonhard Euler': ['Seven Bridges'],
+    'Seven Bridges of Königsberg': ['Leonhard Euler', 'Graph theory'],
+}
+REDIRECTS = {'Seven Bridges': 'Seven Bridges of Königsberg'}
+
+
+class MockWiki(BaseHTTPRequestHandler):
+    """
+    Query API over PAGES, answering with formatversion=2. Titles are normalized
+    like MediaWiki does, REDIRECTS are followed, and the links of a query are
+    split in continuations of LINK_LIMIT links. The first *throttled* requests
+    get a 429 with a Retry-After of *retryAfter* seconds
+    """
+    LINK_LIMIT = 2
+
+    requests = []
+    throttled = 0
+    retryAfter = '1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        MockWiki.requests.append((monotonic(), params))
+        if len(MockWiki.requests) <= MockWiki.throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', MockWiki.retryAfter)
+            self.end_headers()
+            return
+        self.reply(self.query(params))
+
+    def reply(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def query(self, params):
+        normalized, redirects, titles = [], [], []
+        for title in params['titles'].split('|'):
+            canonical = title.replace('_', ' ')
+            canonical = canonical[:1].upper() + canonical[1:]
+            if canonical != title:
+                normalized.append({'from': title, 'to': canonical})
+            if canonical in REDIRECTS:
+                redirects.append({'from': canonical, 'to': REDIRECTS[canonical]})
+                canonical = REDIRECTS[canonical]
+            if canonical not in titles:
+                titles.append(canonical)
+
+        offset = int(params.get('plcontinue', 0))
+        links = [(title, link) for title in titles for link in PAGES.get(title, [])]
+        pages = []
+        for title in titles:
+            if title not in PAGES:
+                pages.append({'ns': 0, 'title': title, 'missing': True})
+                continue
+            page = {'pageid': list(PAGES).index(title) + 1, 'ns': 0, 'title': title, 'links': [
+                {'ns': 0, 'title': link} for source, link in links[offset:offset + self.LINK_LIMIT] if source == title
+            ]}
+            if offset == 0:
+                page['categories'] = [{'ns': 14, 'title': 'Category:Graph theory'}]
+                page['extract'] = 'About %s.' % title
+            pages.append(page)
+
+        data = {'batchcomplete': True, 'query': {'normalized': normalized, 'redirects': redirects, 'pages': pages}}
+        if offset + self.LINK_LIMIT < len(links):
+            data = {'continue': {'plcontinue': str(offset + self.LINK_LIMIT), 'continue': '||'}, **data}
+            del data['batchcomplete']
+        return data
+
+
+@pytest.fixture
+def apiUrl():
+    MockWiki.requests = []
+    MockWiki.throttled = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockWiki)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:%d/w/api.php' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_fetchPagesQueriesTitlesTogether(apiUrl):
+    api = WikiApi(apiUrl=apiUrl)
+    pages = api.fetchPages(['Graph theory', 'Vertex', 'Edge'], loadDetails=False)
+
+    assert sorted(pages) == ['Edge', 'Graph theory', 'Vertex']
+    # 7 links, 2 per response
+    assert api.requestCount == len(MockWiki.requests) == 4
+    for _, params in MockWiki.requests:
+        assert params['titles'] == 'Graph theory|Vertex|Edge'
+        assert params['formatversion'] == '2'
+        assert 'extracts' not in params['prop']
+
+
+def test_fetchPagesMergesContinuations(apiUrl):
+    pages = WikiApi(apiUrl=apiUrl).fetchPages(['Graph theory', 'Vertex'])
+
+    page = pages['Graph theory']
+    assert page.links == PAGES['Graph theory']
+    assert page.categories == ['Graph theory']
+    assert page.summary == 'About Graph theory.'
+    assert page.pageid == '1'
+    assert pages['Vertex'].links == PAGES['Vertex']
+
+
+def test_fetchPagesFollowsNormalizedAndRedirectedTitles(apiUrl):
+    pages = WikiApi(apiUrl=apiUrl).fetchPages(['graph_theory', 'Seven Bridges', 'seven_Bridges'])
+
+    assert pages['graph_theory'].title == 'Graph theory'
+    assert pages['Seven Bridges'].title == 'Seven Bridges of Königsberg'
+    assert pages['seven_Bridges'] is pages['Seven Bridges']
+    assert pages['Seven Bridges'].links == PAGES['Seven Bridges of Königsberg']
+
+
+def test_fetchPagesLeavesOutMissingPages(apiUrl):
+    pages = WikiApi(apiUrl=apiUrl).fetchPages(['Edge', 'Missing page'])
+
+    assert list(pages) == ['Edge']
+
+
+def test_throttledRequestsWaitForRetryAfter(apiUrl):
+    MockWiki.throttled = 1
+    limiter = RateLimiter(rate=100, burst=4)
+    pages = WikiApi(apiUrl=apiUrl, limiter=limiter).fetchPages(['Leonhard Euler'])
+
+    assert pages['Leonhard Euler'].links == ['Seven Bridges']
+    (throttledAt, _), (retriedAt, _) = MockWiki.requests[:2]
+    assert retriedAt - throttledAt >= 1
+
+
+def test_throttledRequestsGiveUp(apiUrl, monkeypatch):
+    MockWiki.throttled = 100
+    MockWiki.retryAfter = '0'
+    monkeypatch.setattr(WikiApi, 'MAX_RETRIES', 1)
+    with pytest.raises(WikiApiError):
+        WikiApi(apiUrl=apiUrl, limiter=RateLimiter(rate=100)).fetchPages(['Edge'])
+    assert len(MockWiki.requests) == 2
+
+
+def createCrawl(tmp_path):
+    canvas = Canvas(1080, 650)
+    canvas.addMode(DarkViewMode(canvas))
+    crawlMode = CrawlMode(canvas)
+    canvas.addMode(crawlMode)
+    crawlMode.checkpointPath = str(tmp_path / 'crawl.checkpoint')
+    return canvas, crawlMode
+
+
+def test_crawl(app, apiUrl, tmp_path, monkeypatch):
+    monkeypatch.setattr(WikiApi, 'BATCH_SIZE', 2)
+    canvas, crawlMode = createCrawl(tmp_path)
+    crawlMode.setCrawlSetting(
+        searchAlgo='BFS', rate=1000, startPage='Graph theory', apiUrl=apiUrl, concurrency=2, useCache=False
+    )
+
+    crawlMode.start()
+    crawlMode.crawlThread.join(30)
+    assert crawlMode.status == 'done'
+    canvas.close()
+
+    g = canvas.g
+    assert set(g.vs.select(visited=True)['title']) == set(PAGES)
+    assert g.vs.select(visited=False)['title'] == ['Missing page']
+    assert g.vcount() == len(PAGES) + 1
+
+    vertex = {title: g.vs[index] for title, index in g['title'].items()}
+    assert vertex['Seven Bridges'] == vertex['Seven Bridges of Königsberg']
+    assert vertex['Graph theory']['depth'] == 0
+    assert vertex['Leonhard Euler']['depth'] == 1
+    assert vertex['Seven Bridges of Königsberg']['depth'] == vertex['Missing page']['depth'] == 2
+    for title, links in PAGES.items():
+        assert sorted(g.vs[e.target]['title'] for e in g.es.select(_source=vertex[title].index)) == \
+            sorted(vertex[link]['title'] for link in links)
+    assert g.vs[0]['summary'] == 'About Graph theory.'
+
+    assert all(len(params['titles'].split('|')) <= 2 for _, params in MockWiki.requests)
+
+
+def test_resumedCrawlReachesTheSamePages(app, apiUrl, tmp_path, monkeypatch):
+    monkeypatch.setattr(WikiApi, 'BATCH_SIZE', 2)
+    canvas, crawlMode = createCrawl(tmp_path)
+    crawlMode.setCrawlSetting(
+        searchAlgo='BFS', rate=1000, startPage='Graph theory', apiUrl=apiUrl, concurrency=1, useCache=False
+    )
+    crawlMode.start()
+    crawlMode.crawlThread.join(30)
+    canvas.close()
+
+    # interrupted after its first batch, while writing the second
+    lines = (tmp_path / 'crawl.checkpoint').read_text(encoding='utf-8').splitlines(keepends=True)
+    interrupted = tmp_path / 'interrupted.checkpoint'
+    interrupted.write_text(''.join(lines[:2]) + lines[2][:10], encoding='utf-8')
+    logged = {page['title'] for _, page in json.loads(lines[1])['pages']}
+
+    MockWiki.requests = []
+    resumedCanvas, resumedCrawlMode = createCrawl(tmp_path)
+    resumedCrawlMode.resumeCrawl(str(interrupted))
+    resumedCrawlMode.crawlThread.join(30)
+    assert resumedCrawlMode.status == 'done'
+    resumedCanvas.close()
+
+    g, resumed = canvas.g, resumedCanvas.g
+    assert set(resumed.vs.select(visited=True)['title']) == set(g.vs.select(visited=True)['title'])
+    assert sorted(zip(resumed.vs['title'], resumed.vs['depth'])) == sorted(zip(g.vs['title'], g.vs['depth']))
+    assert resumed.ecount() == g.ecount()
+
+    fetched = {title for _, params in MockWiki.requests for title in params['titles'].split('|')}
+    assert len(logged) > 0 and fetched.isdisjoint(logged)
+    # the resumed crawl goes on in its own log, later crawls still start a new one
+    assert resumedCrawlMode.checkpointPath == str(tmp_path / 'crawl.checkpoint')
+    assert len(list(CrawlCheckpoint(str(interrupted)).batches())) == len(lines) - 1
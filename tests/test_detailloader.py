@@ -0,0 +1,69 @@
+"""
+DetailLoader with an API which fails on demand.
+
+    python -m pytest tests
+"""
+
+from threading import Event
+
+from igraph import Graph
+from PyQt5.QtCore import Qt
+
+from canvas.DetailLoader import DetailLoader, LOADING_DETAILS, NO_DETAILS
+from canvas.WikiApi import WikiApiError, WikiPage
+
+
+class FlakyApi:
+    """
+    fetchPages fails while *failing*
+    """
+
+    def __init__(self):
+        self.failing = True
+        self.requests = 0
+
+    def fetchPages(self, titles, loadDetails=True):
+        self.requests += 1
+        if self.failing:
+            raise WikiApiError('Unavailable')
+        page = WikiPage(titles[0], 1)
+        page.summary = 'About %s.' % titles[0]
+        return {titles[0]: page}
+
+
+def createVertex():
+    g = Graph(n=1, directed=True)
+    g['lazyDetails'] = True
+    g.vs['title'] = ['Graph theory']
+    g.vs['visited'] = [True]
+    return g.vs[0]
+
+
+def loadDetails(loader, vertex):
+    """
+    Details of *vertex* once the fetch it starts is over
+    """
+    loaded = Event()
+    loader.detailsLoadedSignal.connect(loaded.set, Qt.DirectConnection)
+    assert loader.details(vertex) is LOADING_DETAILS
+    assert loaded.wait(10)
+    loader.detailsLoadedSignal.disconnect()
+    return loader.details(vertex)
+
+
+def test_failuresAreRetriedAfterADelay():
+    api = FlakyApi()
+    loader = DetailLoader()
+    loader.setClients('en', api)
+    vertex = createVertex()
+
+    assert loadDetails(loader, vertex) is NO_DETAILS
+    assert loader.details(vertex) is NO_DETAILS
+    assert api.requests == 1
+
+    api.failing = False
+    loader.failed[('en', 'Graph theory')] = 0
+    assert loadDetails(loader, vertex)['summary'] == 'About Graph theory.'
+    assert loader.details(vertex)['summary'] == 'About Graph theory.'
+    assert api.requests == 2
+    loader.close()
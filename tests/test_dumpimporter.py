@@ -0,0 +1,167 @@
+"""
+DumpImporter over small synthetic dumps.
+
+    python -m pytest tests
+"""
+
+import gzip
+
+import pytest
+
+from canvas.DumpImporter import DumpImporter, DumpImportError
+
+PAGE_COLUMNS = [('page_id', 'int'), ('page_namespace', 'int'), ('page_title', 'varbinary'),
+                ('page_is_redirect', 'tinyint'), ('page_len', 'int')]
+PAGES = [
+    (1, 0, 'Graph_theory', 0, 100),
+    (2, 0, 'Vertex', 0, 20),
+    (3, 0, "O'Brien_\\\\_co", 0, 30),
+    (4, 0, 'Euler_(mathematician),_Leonhard', 0, 40),
+    (5, 0, 'Graph_Theory', 1, 10),
+    (6, 1, 'Graph_theory', 0, 10),
+    (7, 0, 'Far', 0, 10),
+]
+# (from, namespace, title)
+LINKS = [
+    (1, 0, 'Vertex'),
+    (1, 0, "O'Brien_\\\\_co"),
+    (1, 0, 'Graph_Theory'),  # redirect
+    (1, 1, 'Graph_theory'),  # talk page
+    (1, 0, 'Nowhere'),
+    (2, 0, 'Euler_(mathematician),_Leonhard'),
+    (3, 0, 'Graph_theory'),
+    (4, 0, 'Far'),
+    (6, 0, 'Vertex'),
+    (7, 0, 'Graph_theory'),
+]
+TITLES = ['Graph theory', 'Vertex', "O'Brien \\ co", 'Euler (mathematician), Leonhard', 'Far']
+EDGES = [
+    ('Graph theory', 'Vertex'), ('Graph theory', "O'Brien \\ co"), ('Vertex', 'Euler (mathematician), Leonhard'),
+    ("O'Brien \\ co", 'Graph theory'), ('Euler (mathematician), Leonhard', 'Far'), ('Far', 'Graph theory'),
+]
+
+
+def sqlValue(value):
+    if isinstance(value, int):
+        return str(value)
+    return "'%s'" % value.replace("'", "\\'")
+
+
+def writeSql(path, table, columns, rows, rowsPerInsert=3):
+    """
+    MySQL dump of *table*, *rows* being the values with strings unquoted but escaped
+    """
+    lines = ['-- MySQL dump\n', 'CREATE TABLE `%s` (\n' % table]
+    lines += ['  `%s` %s(255) NOT NULL,\n' % column for column in columns]
+    lines.append('  PRIMARY KEY (`%s`)\n) ENGINE=InnoDB;\n' % columns[0][0])
+    for i in range(0, len(rows), rowsPerInsert):
+        values = ','.join('(%s)' % ','.join(sqlValue(value) for value in row) for row in rows[i:i + rowsPerInsert])
+        lines.append('INSERT INTO `%s` VALUES %s;\n' % (table, values))
+    text = ''.join(lines)
+    if path.suffix == '.gz':
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def createImporter(tmp_path, dumpFormat):
+    """
+    Importer of PAGES & LINKS, with pagelinks in the format before or after linktarget
+    """
+    suffix = '.sql.gz' if dumpFormat == 'gzip' else '.sql'
+    page = writeSql(tmp_path / ('page' + suffix), 'page', PAGE_COLUMNS, PAGES)
+    if dumpFormat == 'linktarget':
+        targets = sorted({(namespace, title) for _, namespace, title in LINKS})
+        targetIds = {target: i + 100 for i, target in enumerate(targets)}
+        linktarget = writeSql(
+            tmp_path / 'linktarget.sql', 'linktarget',
+            [('lt_id', 'bigint'), ('lt_namespace', 'int'), ('lt_title', 'varbinary')],
+            [(targetIds[target], *target) for target in targets]
+        )
+        pagelinks = writeSql(
+            tmp_path / 'pagelinks.sql', 'pagelinks',
+            [('pl_from', 'int'), ('pl_from_namespace', 'int'), ('pl_target_id', 'bigint')],
+            [(source, 0, targetIds[(namespace, title)]) for source, namespace, title in LINKS]
+        )
+        return DumpImporter(page, pagelinks, linktarget, progress=lambda *args: None)
+    pagelinks = writeSql(
+        tmp_path / ('pagelinks' + suffix), 'pagelinks',
+        [('pl_from', 'int'), ('pl_namespace', 'int'), ('pl_title', 'varbinary'), ('pl_from_namespace', 'int')],
+        [(source, namespace, title, 0) for source, namespace, title in LINKS]
+    )
+    return DumpImporter(page, pagelinks, progress=lambda *args: None)
+
+
+@pytest.fixture(params=['old', 'linktarget', 'gzip'])
+def importer(request, tmp_path):
+    return createImporter(tmp_path, request.param)
+
+
+def edgeTitles(g):
+    return sorted((g.vs[source]['title'], g.vs[target]['title']) for source, target in g.get_edgelist())
+
+
+def test_buildAllKeepsArticlesOnly(importer):
+    g = importer.build()
+
+    assert sorted(g.vs['title']) == sorted(TITLES)
+    assert dict(zip(g.vs['title'], g.vs['pageid']))["O'Brien \\ co"] == '3'
+    assert all(g.vs['visited'])
+    assert edgeTitles(g) == sorted(EDGES)
+
+
+@pytest.mark.parametrize('hops, depths', [
+    (1, {'Graph theory': 0, 'Vertex': 1, "O'Brien \\ co": 1}),
+    (2, {'Graph theory': 0, 'Vertex': 1, "O'Brien \\ co": 1, 'Euler (mathematician), Leonhard': 2}),
+    (3, {'Graph theory': 0, 'Vertex': 1, "O'Brien \\ co": 1, 'Euler (mathematician), Leonhard': 2, 'Far': 3}),
+])
+def test_buildNeighbourhoodStopsAfterHops(importer, hops, depths):
+    g = importer.build('Graph_theory', hops)
+
+    assert dict(zip(g.vs['title'], g.vs['depth'])) == depths
+    assert g.vs[0]['title'] == 'Graph theory'
+    assert [depth < hops for depth in g.vs['depth']] == g.vs['visited']
+    # links of the pages at the last hop are not read
+    assert edgeTitles(g) == sorted(
+        (source, target) for source, target in EDGES if source in depths and target in depths and depths[source] < hops
+    )
+
+
+def test_unknownStartIsRejected(importer):
+    with pytest.raises(DumpImportError):
+        importer.build('Graph_Theory')
+
+
+def test_tsv(tmp_path):
+    page = tmp_path / 'page.tsv'
+    page.write_text('1\tGraph_theory\n2\tVertex\n3\tTab\tin title\n', encoding='utf-8')
+    pagelinks = tmp_path / 'pagelinks.tsv'
+    pagelinks.write_text('1\tVertex\n2\tGraph_theory\n2\tNowhere\n1\tTab\tin title\n', encoding='utf-8')
+    g = DumpImporter(str(page), str(pagelinks), progress=lambda *args: None).build()
+
+    assert g.vs['title'] == ['Graph theory', 'Vertex', 'Tab\tin title']
+    assert edgeTitles(g) == [('Graph theory', 'Tab\tin title'), ('Graph theory', 'Vertex'), ('Vertex', 'Graph theory')]
+
+
+def test_missingLinktargetIsReported(tmp_path):
+    importer = createImporter(tmp_path, 'linktarget')
+    importer.linktargetPath = None
+    with pytest.raises(DumpImportError):
+        importer.build()
+
+
+def test_progressEndsOncePerFile(importer):
+    reports = []
+    importer.progress = lambda path, fraction, rows: reports.append((path, fraction, rows))
+    importer.PROGRESS_STEP = 0
+    importer.build()
+
+    paths = {path for path, _, _ in reports}
+    assert len(paths) == (3 if importer.linktargetPath else 2)
+    for path in paths:
+        fractions = [fraction for reported, fraction, _ in reports if reported == path]
+        assert fractions[-1] == 1 and fractions.count(1) == 1
+        assert fractions == sorted(fractions)
+    assert (str(importer.pagePath), 1, len(PAGES)) in reports
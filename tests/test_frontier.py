@@ -0,0 +1,124 @@
+"""
+Popping orders of Frontier.
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from canvas.Frontier import Frontier
+
+
+def popAll(frontier):
+    return [frontier.pop() for _ in range(len(frontier))]
+
+
+def test_bfsPopsFirstPushedFirst():
+    frontier = Frontier('BFS')
+    frontier.extend([1, 2])
+    frontier.push(3)
+    assert popAll(frontier) == [1, 2, 3]
+
+
+def test_dfsPopsLastPushedFirstInTheOrderGiven():
+    frontier = Frontier('DFS')
+    frontier.extend([1, 2])
+    frontier.extend([3, 4])
+    assert popAll(frontier) == [3, 4, 1, 2]
+
+
+def test_randPopsEveryVertexOnce():
+    frontier = Frontier('RAND')
+    frontier.extend(range(100))
+    assert sorted(popAll(frontier)) == list(range(100))
+
+
+@pytest.mark.parametrize('order', ['BFS', 'DFS', 'RAND', 'PRIORITY'])
+def test_verticesAreQueuedAtMostOnce(order):
+    frontier = Frontier(order, score=lambda vertex: 0)
+    frontier.extend([1, 2, 1])
+    frontier.extend([2, 3])
+    assert len(frontier) == 3
+    popped = frontier.pop()
+    frontier.push(popped)
+    assert popped in frontier
+    assert sorted(popAll(frontier)) == sorted({1, 2, 3} - {popped})
+
+
+def test_unknownOrderIsRejected():
+    with pytest.raises(ValueError):
+        Frontier('LIFO')
+    with pytest.raises(ValueError):
+        Frontier('PRIORITY')
+
+
+def test_priorityPopsHighestScoreFirst():
+    scores = {1: 1, 2: 3, 3: 2}
+    frontier = Frontier('PRIORITY', scores.get)
+    frontier.extend([1, 2, 3])
+    assert popAll(frontier) == [2, 3, 1]
+
+
+def test_priorityPushingAgainUpdatesTheScore():
+    scores = {1: 1, 2: 3, 3: 2}
+    frontier = Frontier('PRIORITY', scores.get)
+    frontier.extend([1, 2, 3])
+    scores[1] = 5
+    scores[2] = 0
+    frontier.extend([1, 2])
+    assert len(frontier) == 3
+    assert popAll(frontier) == [1, 3, 2]
+
+
+def test_priorityNeverQueuesPoppedVerticesAgain():
+    scores = {1: 2, 2: 1}
+    frontier = Frontier('PRIORITY', scores.get)
+    frontier.extend([1, 2])
+    assert frontier.pop() == 1
+    scores[1] = 10
+    frontier.extend([1])
+    assert popAll(frontier) == [2]
+    assert len(frontier) == 0
+
+
+def test_priorityHeapStaysLinearInQueuedVertices():
+    scores = dict.fromkeys(range(10), 0)
+    frontier = Frontier('PRIORITY', scores.get)
+    frontier.extend(range(10))
+    for step in range(1, 100):
+        for vertex in scores:
+            scores[vertex] = step
+        frontier.extend(range(10))
+        assert len(frontier.queue) <= 2 * len(frontier)
+    assert sorted(popAll(frontier)) == list(range(10))
+
+
+@pytest.mark.parametrize('order, popped', [('BFS', [1, 2, 3, 4, 5]), ('DFS', [1, 2, 4, 5, 3])])
+def test_requeuedVerticesArePoppedNext(order, popped):
+    frontier = Frontier(order)
+    frontier.extend([1, 2, 3])
+    batch = [frontier.pop(), frontier.pop()]
+    frontier.extend([4, 5])
+    frontier.requeue(batch)
+    assert popAll(frontier) == popped
+
+
+def test_priorityRequeuedVerticesKeepTheirRank():
+    scores = {1: 3, 2: 2, 3: 1, 4: 0}
+    frontier = Frontier('PRIORITY', scores.get)
+    frontier.extend([1, 2, 3, 4])
+    batch = [frontier.pop(), frontier.pop()]
+    scores[2] = 0.5
+    frontier.requeue(batch)
+    assert popAll(frontier) == [1, 3, 2, 4]
+
+
+@pytest.mark.parametrize('order', ['BFS', 'DFS', 'RAND', 'PRIORITY'])
+def test_removedVerticesAreNotPoppedButStillSeen(order):
+    frontier = Frontier(order, score=lambda vertex: -vertex)
+    frontier.extend([1, 2, 3, 4])
+    frontier.remove([2, 4, 5])
+    assert len(frontier) == 2
+    assert sorted(popAll(frontier)) == [1, 3]
+    frontier.extend([2, 4])
+    assert len(frontier) == 0
@@ -0,0 +1,86 @@
+"""
+PageCache over a temporary SQLite file.
+
+    python -m pytest tests
+"""
+
+import sys
+
+import pytest
+
+from canvas.PageCache import PageCache
+from canvas.WikiApi import WikiPage
+
+
+def makePage(title, pageid, links=()):
+    page = WikiPage(title, pageid)
+    page.links = list(links)
+    return page
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Time seen by PageCache, in seconds, moved forward with clock[0] += ...
+    """
+    now = [1000000.0]
+    monkeypatch.setattr(sys.modules['canvas.PageCache'], 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = PageCache(str(tmp_path / 'pages.sqlite'), ttl=100, maxPages=3)
+    yield cache
+    cache.close()
+
+
+def test_titlesAskedForPointToThePage(cache):
+    page = makePage('Seven Bridges of Königsberg', 5, ['Leonhard Euler'])
+    cache.put('en', {'Seven Bridges': page, 'seven_Bridges': page})
+
+    pages = cache.get('en', ['Seven Bridges', 'seven_Bridges', 'Seven Bridges of Königsberg', 'Vertex'])
+    assert sorted(pages) == ['Seven Bridges', 'Seven Bridges of Königsberg', 'seven_Bridges']
+    assert all(vars(page) == vars(pages['Seven Bridges']) for page in pages.values())
+    assert pages['Seven Bridges'].links == ['Leonhard Euler']
+    assert cache.get('fr', ['Seven Bridges']) == {}
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_pagesWithoutDetailsAreNotGivenForDetails(cache):
+    cache.put('en', {'Vertex': makePage('Vertex', 2)})
+
+    assert list(cache.get('en', ['Vertex'])) == ['Vertex']
+    assert cache.get('en', ['Vertex'], details=True) == {}
+
+
+def test_pagesExpireAfterTtl(cache, clock):
+    cache.put('en', {'Vertex': makePage('Vertex', 2)})
+    clock[0] += 50
+    cache.put('en', {'Edge': makePage('Edge', 3)})
+
+    clock[0] += 60
+    assert list(cache.get('en', ['Vertex', 'Edge'])) == ['Edge']
+
+    cache.purge()
+    assert cache.db.execute('SELECT pageid FROM pages').fetchall() == [('3',)]
+    assert cache.db.execute('SELECT title FROM titles').fetchall() == [('Edge',)]
+
+
+def test_oldestPagesAndTheirTitlesAreEvicted(cache, clock):
+    for pageid, title in enumerate(['Graph theory', 'Vertex', 'Edge', 'Leonhard Euler']):
+        clock[0] += 1
+        cache.put('en', {title.lower(): makePage(title, pageid)})
+
+    assert sorted(cache.get('en', ['Vertex', 'Edge', 'Leonhard Euler'])) == ['Edge', 'Leonhard Euler', 'Vertex']
+    titles = cache.db.execute('SELECT title FROM titles ORDER BY title').fetchall()
+    assert [title for title, in titles] == ['Edge', 'Leonhard Euler', 'Vertex', 'edge', 'leonhard euler', 'vertex']
+
+
+def test_closedCacheFindsAndStoresNothing(cache):
+    cache.put('en', {'Vertex': makePage('Vertex', 2)})
+    cache.close()
+
+    assert cache.get('en', ['Vertex']) == {}
+    cache.put('en', {'Edge': makePage('Edge', 3)})
+    cache.close()